@@ -0,0 +1,267 @@
+import argparse
+import json
+import random
+from functools import cmp_to_key
+from itertools import zip_longest
+from sys import exit
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from task_2 import Version
+
+
+# =====================================
+# Workload generation
+# =====================================
+
+
+def generate_versions(size: int, mix: str, seed: int = 0) -> List[str]:
+    """
+    Generate version strings of particular mix:
+        basic - three components, rare prereleases
+        prerelease - every second version is a prerelease
+        deep - from 4 to 8 components, some with 'b' suffix
+    """
+    rng = random.Random(seed)
+    #  Includes identifiers ordered differently by string comparison and SemVer precedence ('rc.2' and 'rc.10')
+    prereleases = ['alpha', 'alpha.1', 'alpha.beta', 'beta', 'beta.2', 'beta.11', 'rc.1', 'rc.2', 'rc.10']
+    versions = []
+    for _ in range(size):
+        if mix == 'deep':
+            components = [str(rng.randint(0, 20)) for _ in range(rng.randint(4, 8))]
+            if rng.random() < 0.1:
+                components[-1] += 'b'
+        else:
+            components = [str(rng.randint(0, 20)) for _ in range(3)]
+        version = '.'.join(components)
+
+        prerelease_probability = 0.5 if mix == 'prerelease' else 0.05
+        if rng.random() < prerelease_probability:
+            version += '-' + rng.choice(prereleases)
+        versions.append(version)
+    return versions
+
+
+# =====================================
+# Reference ordering
+# =====================================
+
+
+def semver_prerelease_key(prerelease: str) -> tuple:
+    """
+    SemVer 2.0.0 precedence of prerelease: identifiers are compared one by one, numeric ones numerically
+    and lower than alphanumeric ones, the longer of otherwise equal identifier lists is higher
+    """
+    return tuple((0, int(i), '') if i.isdigit() else (1, 0, i) for i in prerelease.split('.'))
+
+
+def reference_compare(left: str, right: str, semver: bool = False) -> int:
+    """
+    Straightforward comparator implementing Version precedence rules independently from Version:
+    components are compared as integers (missing ones are zeros, 'b' suffix means '.1'),
+    prerelease goes before release, prereleases are compared as strings.
+    Comparing prereleases as strings is where Version deviates from SemVer ('rc.10' < 'rc.2'),
+    with 'semver' prereleases are compared by SemVer precedence instead
+    """
+    def parse(version: str):
+        components, _, prerelease = version.partition('-')
+        return [int(c) for c in components.replace('b', '.1').split('.')], prerelease
+
+    left_components, left_prerelease = parse(left)
+    right_components, right_prerelease = parse(right)
+    for left_c, right_c in zip_longest(left_components, right_components, fillvalue=0):
+        if left_c != right_c:
+            return -1 if left_c < right_c else 1
+
+    if left_prerelease == right_prerelease:
+        return 0
+    if not left_prerelease or not right_prerelease:
+        return 1 if not left_prerelease else -1
+    if semver:
+        left_prerelease, right_prerelease = map(semver_prerelease_key, (left_prerelease, right_prerelease))
+    return -1 if left_prerelease < right_prerelease else 1
+
+
+def sample_pairs(versions: List[str], pairs: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Random pairs of versions. Every second pair shares release part, so prerelease precedence is exercised too
+    """
+    rng = random.Random(seed)
+    releases = {}
+    for version in versions:
+        releases.setdefault(version.partition('-')[0], []).append(version)
+    same_release = [group for group in releases.values() if len(group) > 1]
+
+    sampled = []
+    for number in range(min(pairs, len(versions) ** 2)):
+        group = rng.choice(same_release) if same_release and number % 2 else versions
+        sampled.append((rng.choice(group), rng.choice(group)))
+    return sampled
+
+
+def check_conformance(versions: List[str], pairs: int = 10000, seed: int = 0) -> List[str]:
+    """
+    Compare Version ordering with reference one. Returns list of found mismatches
+    """
+    errors = []
+    for left, right in sample_pairs(versions, pairs, seed):
+        expected = reference_compare(left, right)
+        if (Version(left) < Version(right)) != (expected < 0):
+            errors.append(f'{left} < {right}')
+
+    expected_order = [Version.key_of(v) for v in sorted(versions, key=cmp_to_key(reference_compare))]
+    if [Version.key_of(v) for v in Version.sort_many(versions)] != expected_order:
+        errors.append('sort_many order differs from reference order')
+    if Version.key_of(Version.max_of(versions)) != expected_order[-1]:
+        errors.append('max_of differs from reference maximum')
+    return errors
+
+
+def count_semver_deviations(versions: List[str], pairs: int = 10000, seed: int = 0) -> int:
+    """
+    Number of sampled pairs, which Version orders differently from SemVer precedence
+    """
+    return sum(
+        (Version(left) < Version(right)) != (reference_compare(left, right, semver=True) < 0)
+        for left, right in sample_pairs(versions, pairs, seed)
+    )
+
+
+# =====================================
+# Measurements
+# =====================================
+
+
+def measure(function: Callable[[], object]) -> float:
+    start = perf_counter()
+    function()
+    return perf_counter() - start
+
+
+def run_benchmark(size: int, mix: str, seed: int = 0) -> Dict[str, float]:
+    """
+    Measure parse throughput, comparisons per second and sort time for generated versions
+    """
+    versions = generate_versions(size, mix, seed)
+    results = {}
+
+    Version.cache.cache_clear()
+    elapsed = measure(lambda: [Version(v) for v in versions])
+    results['parse_per_sec'] = size / elapsed
+
+    #  Repeated strings from a pool, which fits interning cache, so they are served by it
+    rng = random.Random(seed)
+    pool = list(dict.fromkeys(versions))[:Version.CACHE_SIZE]
+    repeated = [rng.choice(pool) for _ in range(size)]
+    Version.cache.cache_clear()
+    for version in pool:
+        Version(version)
+    elapsed = measure(lambda: [Version(v) for v in repeated])
+    results['interned_parse_per_sec'] = size / elapsed
+
+    objects = [Version(v) for v in versions[:100000]]
+    pairs = [(rng.choice(objects), rng.choice(objects)) for _ in range(min(size, 1000000))]
+    elapsed = measure(lambda: [left < right for left, right in pairs])
+    results['comparisons_per_sec'] = len(pairs) / elapsed
+
+    results['sorted_objects_sec'] = measure(lambda: sorted(Version(v) for v in versions))
+    results['sort_many_sec'] = measure(lambda: Version.sort_many(versions))
+    results['max_of_sec'] = measure(lambda: Version.max_of(versions))
+    return results
+
+
+def print_table(rows: List[dict]) -> None:
+    columns = list(rows[0].keys())
+    widths = [max(len(column), *(len(format_value(row[column])) for row in rows)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(format_value(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def format_value(value) -> str:
+    if isinstance(value, float):
+        return f'{value:,.0f}' if value >= 100 else f'{value:.4f}'
+    return str(value)
+
+
+def find_regressions(rows: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """
+    Compare results with saved baseline. Throughput metrics must not drop and timings must not grow
+    more than by tolerance fraction
+    """
+    regressions = []
+    baseline_rows = {(row['size'], row['mix']): row for row in baseline}
+    for row in rows:
+        old_row = baseline_rows.get((row['size'], row['mix']))
+        if old_row is None:
+            continue
+        for metric, value in row.items():
+            old_value = old_row.get(metric)
+            if not isinstance(value, float) or not old_value:
+                continue
+            if metric.endswith('_per_sec'):
+                regressed = value < old_value * (1 - tolerance)
+            else:
+                regressed = value > old_value * (1 + tolerance)
+            if regressed:
+                regressions.append(f"{row['size']} {row['mix']} {metric}: {old_value:.4f} -> {value:.4f}")
+    return regressions
+
+
+class CLI:
+    """
+    CLI util for benchmark parameters
+    """
+    AVAILABLE_MIXES = ['basic', 'prerelease', 'deep']
+
+    @classmethod
+    def get_args(cls) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(description='Benchmark and conformance suite for Version comparisons')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000],
+                            help='Numbers of generated versions, e.g. 10000 1000000 10000000. Defaults to 10000')
+        parser.add_argument('--mixes', nargs='+', choices=cls.AVAILABLE_MIXES, default=cls.AVAILABLE_MIXES,
+                            help='Version mixes to run. Defaults to all of them')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for version generation')
+        parser.add_argument('--output', help='Save results to json file')
+        parser.add_argument('--baseline', help='Json file with previous results to check for regressions')
+        parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='Allowed relative slowdown compared to baseline. Defaults to 0.1')
+        return parser.parse_args()
+
+
+def main():
+    args = CLI.get_args()
+
+    failed = False
+    for mix in args.mixes:
+        errors = check_conformance(generate_versions(10000, mix, args.seed), seed=args.seed)
+        if errors:
+            failed = True
+            print(f'Conformance failed for {mix} mix:', *errors[:10], sep='\n    ')
+        deviations = count_semver_deviations(generate_versions(10000, mix, args.seed), seed=args.seed)
+        print(f'{mix} mix: {deviations} of 10000 pairs are ordered differently from SemVer precedence, '
+              f'as Version compares prereleases as strings')
+
+    rows = []
+    for size in args.sizes:
+        for mix in args.mixes:
+            rows.append({'size': size, 'mix': mix, **run_benchmark(size, mix, args.seed)})
+    print_table(rows)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(rows, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(rows, json.load(file), args.tolerance)
+        if regressions:
+            failed = True
+            print('Regressions found:', *regressions, sep='\n    ')
+
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,200 @@
-from functools import total_ordering
-from itertools import zip_longest
+from functools import lru_cache, total_ordering
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    #  Bulk API falls back to pure python sorting
+    np = None
+
+
+class InterningMeta(type):
+    """
+    Makes repeated construction from the same string return the same instance.
+    Every class keeps instances in its own bounded LRU cache 'cls.cache' (functools.lru_cache, so lookups do not
+    take python level locks), whose 'cache_info()' counts hits and misses, so 'CACHE_SIZE' can be tuned.
+    Threads constructing the same new version at once could get different instances, only one of them is cached
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls.cache = lru_cache(maxsize=cls.CACHE_SIZE)(super().__call__)
+
+    def __call__(cls, version: str):
+        return cls.cache(version)
+
+    def resize_cache(cls, maxsize: int) -> None:
+        """
+        Replace cache with the one of another size. Already interned instances are dropped
+        """
+        cls.CACHE_SIZE = maxsize
+        cls.cache = lru_cache(maxsize=maxsize)(super().__call__)
 
 
 @total_ordering
-class Version:
+class Version(metaclass=InterningMeta):
     def __init__(self, version: str):
         self.version = version
+        self.components, self.prerelease = self.split(version)
+        self._key = None
+
+    @staticmethod
+    def split(version: str) -> Tuple[str, Optional[str]]:
+        """
+        Split version string into dot separated components and prerelease part
+        """
         if '-' in version:
-            self.components, self.prerelease = version.split('-')
+            components, prerelease = version.split('-')
         else:
-            self.components, self.prerelease = version, None
+            components, prerelease = version, None
+        return components.replace('b', '.1'), prerelease
+
+    @classmethod
+    def key_of(cls, version: str) -> tuple:
+        """
+        Sort key of version string. Trailing zero components are dropped, so '1.0' and '1.0.0' are of the same
+        precedence, and release goes after all of its prereleases
+        """
+        components, prerelease = cls.split(version)
+        numbers = [int(c) for c in components.split('.')]
+        while numbers and not numbers[-1]:
+            numbers.pop()
+        return tuple(numbers), not prerelease, prerelease or ''
 
-        self.components = self.components.replace('b', '.1')
+    @property
+    def key(self) -> tuple:
+        if self._key is None:
+            self._key = self.key_of(self.version)
+        return self._key
 
     def __eq__(self, other):
         return self.version == other.version
 
     def __lt__(self, other):
-        for self_c, other_c in zip_longest(self.components.split('.'), other.components.split('.'), fillvalue=0):
-            if self_c != other_c:
-                return int(self_c) < int(other_c)
-        if self.prerelease and other.prerelease:
-            return self.prerelease < other.prerelease
-        else:
-            return bool(self.prerelease)
+        return self.key < other.key
+
+    # =====================================
+    # Bulk API
+    # =====================================
+
+    @classmethod
+    def argsort(cls, versions: Iterable[str]) -> List[int]:
+        """
+        Indices that sort versions. Sorting is stable, so versions of the same precedence keep their order
+        """
+        versions = list(versions)
+        encoded = cls._encode(versions)
+        if encoded is None:
+            keys = [cls.key_of(v) for v in versions]
+            return sorted(range(len(versions)), key=keys.__getitem__)
+        return cls._lexsort(*encoded).tolist()
+
+    @classmethod
+    def sort_many(cls, versions: Iterable[str], reverse: bool = False) -> List[str]:
+        """
+        Sort version strings according to Version precedence
+        """
+        versions = list(versions)
+        order = cls.argsort(versions)
+        if reverse:
+            order.reverse()
+        return [versions[i] for i in order]
+
+    @classmethod
+    def max_of(cls, versions: Iterable[str]) -> str:
+        """
+        Version string of the highest precedence (the last of equal ones, as in sorted order)
+        """
+        versions = list(versions)
+        if not versions:
+            raise ValueError('max_of() arg is an empty sequence')
+        return versions[cls._extreme(versions, highest=True)]
+
+    @classmethod
+    def min_of(cls, versions: Iterable[str]) -> str:
+        """
+        Version string of the lowest precedence (the first of equal ones, as in sorted order)
+        """
+        versions = list(versions)
+        if not versions:
+            raise ValueError('min_of() arg is an empty sequence')
+        return versions[cls._extreme(versions, highest=False)]
+
+    @classmethod
+    def _encode(cls, versions: List[str]) -> Optional[Tuple['np.ndarray', List[str]]]:
+        """
+        Fixed-width integer component matrix and prerelease strings of versions.
+        None if numpy is not available or components do not fit into int64, so python keys have to be used
+        """
+        if np is None:
+            return None
+        if not versions:
+            return np.zeros((0, 1), dtype=np.int64), []
+        parts = [version.partition('-') for version in versions]
+        prereleases = [prerelease for _, _, prerelease in parts]
+        if any('-' in prerelease for prerelease in prereleases):
+            raise ValueError('Version can contain only one "-"')
+        components = [numbers.replace('b', '.1') for numbers, _, _ in parts]
+
+        #  Components of all versions are parsed at once and scattered into zero padded rows
+        counts = np.fromiter((c.count('.') for c in components), dtype=np.intp, count=len(versions)) + 1
+        try:
+            flat = np.array(list(map(int, '.'.join(components).split('.'))), dtype=np.int64)
+        except OverflowError:
+            return None
+        width = int(counts.max(initial=1))
+        if (counts == width).all():
+            return flat.reshape(len(versions), width), prereleases
+        rows = np.repeat(np.arange(len(versions)), counts)
+        columns = np.arange(len(flat)) - np.repeat(np.cumsum(counts) - counts, counts)
+        matrix = np.zeros((len(versions), width), dtype=np.int64)
+        matrix[rows, columns] = flat
+        return matrix, prereleases
+
+    @staticmethod
+    def _lexsort(matrix: 'np.ndarray', prereleases: List[str]) -> 'np.ndarray':
+        """
+        Sort encoded versions with one lexsort over components and prerelease rank
+        """
+        if not prereleases:
+            return np.zeros(0, dtype=np.intp)
+        #  Prerelease strings are ranked by their string order, release gets the rank above all prereleases
+        unique, rank = np.unique(np.array(prereleases, dtype=str), return_inverse=True)
+        rank = rank.reshape(-1)
+        is_release = np.fromiter((not p for p in prereleases), dtype=bool, count=len(prereleases))
+        rank[is_release] = len(unique)
+
+        #  Last key is the primary one for lexsort
+        return np.lexsort((rank, *matrix.T[::-1]))
+
+    @classmethod
+    def _extreme(cls, versions: List[str], highest: bool) -> int:
+        """
+        Index of the highest or the lowest version in O(n): candidates are narrowed down component by component,
+        only versions with equal components are compared by prerelease
+        """
+        encoded = cls._encode(versions)
+        if encoded is None:
+            keys = [cls.key_of(v) for v in versions]
+            if highest:
+                return max(range(len(versions)), key=lambda i: (keys[i], i))
+            return min(range(len(versions)), key=keys.__getitem__)
+
+        matrix, prereleases = encoded
+        reduce = np.max if highest else np.min
+        candidates = np.arange(len(versions))
+        for column in matrix.T:
+            values = column[candidates]
+            candidates = candidates[values == reduce(values)]
+            if len(candidates) == 1:
+                return int(candidates[0])
+
+        candidates = candidates.tolist()
+        keys = [(not prereleases[i], prereleases[i]) for i in candidates]
+        best = max(keys) if highest else min(keys)
+        tied = [i for i, key in zip(candidates, keys) if key == best]
+        return tied[-1] if highest else tied[0]
 
 
 def main():
@@ -45,6 +216,14 @@ def main():
         assert Version(version_2) > Version(version_1), "ge failed"
         assert Version(version_2) != Version(version_1), "neq failed"
 
+    assert Version("1.0.0") is Version("1.0.0"), "interning failed"
+
+    versions = [v for pair in to_test for v in pair]
+    assert Version.sort_many(versions) == [v.version for v in sorted(map(Version, versions))], "sort_many failed"
+    assert Version.max_of(versions) == "2.0.0", "max_of failed"
+    assert Version.min_of(versions) == "1.0.0-rc.1", "min_of failed"
+    assert Version.max_of(["1.0.0", str(2 ** 64)]) == str(2 ** 64), "max_of of large components failed"
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
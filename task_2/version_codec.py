@@ -0,0 +1,69 @@
+"""
+Packed byte encoding of versions, whose lexicographic (memcmp) order equals Version precedence.
+
+Layout:
+    component*  0x00  (0x01 prerelease-utf8 | 0x02)
+
+Every component is a length byte (0x01 + number of value bytes) followed by the value in big-endian,
+so larger numbers always have a greater length byte. Trailing zero components are dropped, as they do not
+change precedence. Components end with 0x00, which sorts before any component, so shorter versions go first.
+Prerelease marker 0x01 sorts before release marker 0x02.
+"""
+from typing import List
+
+from task_2 import Version
+
+END_OF_COMPONENTS = 0x00
+PRERELEASE_MARKER = 0x01
+RELEASE_MARKER = 0x02
+
+MIN_DECODED_COMPONENTS = 3
+
+
+def encode(version) -> bytes:
+    """
+    Encode Version instance or version string
+    """
+    key = version.key if isinstance(version, Version) else Version.key_of(version)
+    numbers, is_release, prerelease = key
+
+    encoded = bytearray()
+    for number in numbers:
+        value = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+        if len(value) > 0xfe:
+            raise OverflowError(f'Version component {number} is too large to encode')
+        encoded.append(0x01 + len(value))
+        encoded += value
+    encoded.append(END_OF_COMPONENTS)
+
+    if is_release:
+        encoded.append(RELEASE_MARKER)
+    else:
+        encoded.append(PRERELEASE_MARKER)
+        encoded += prerelease.encode('utf-8')
+    return bytes(encoded)
+
+
+def decode(data: bytes) -> str:
+    """
+    Decode bytes back to canonical version string of the same precedence (at least three components,
+    'b' suffixes are written as '.1')
+    """
+    numbers: List[int] = []
+    position = 0
+    while data[position] != END_OF_COMPONENTS:
+        length = data[position] - 0x01
+        position += 1
+        numbers.append(int.from_bytes(data[position:position + length], 'big'))
+        position += length
+    position += 1
+
+    numbers += [0] * (MIN_DECODED_COMPONENTS - len(numbers))
+    version = '.'.join(map(str, numbers))
+
+    marker = data[position]
+    if marker == PRERELEASE_MARKER:
+        version += '-' + data[position + 1:].decode('utf-8')
+    elif marker != RELEASE_MARKER:
+        raise ValueError(f'Unknown release marker {marker:#x}')
+    return version
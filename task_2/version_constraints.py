@@ -0,0 +1,211 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, NamedTuple, Optional
+
+from task_2 import Version
+
+
+class Interval(NamedTuple):
+    """
+    Interval of version sort keys. None bound means the interval is unbounded on that side
+    """
+    low: Optional[tuple] = None
+    low_inclusive: bool = False
+    high: Optional[tuple] = None
+    high_inclusive: bool = False
+
+    def is_empty(self) -> bool:
+        if self.low is None or self.high is None:
+            return False
+        if self.low == self.high:
+            return not (self.low_inclusive and self.high_inclusive)
+        return self.low > self.high
+
+    def intersect(self, other: 'Interval') -> 'Interval':
+        low, low_inclusive = self.low, self.low_inclusive
+        if other.low is not None and (low is None or other.low > low):
+            low, low_inclusive = other.low, other.low_inclusive
+        elif other.low is not None and other.low == low:
+            low_inclusive = low_inclusive and other.low_inclusive
+
+        high, high_inclusive = self.high, self.high_inclusive
+        if other.high is not None and (high is None or other.high < high):
+            high, high_inclusive = other.high, other.high_inclusive
+        elif other.high is not None and other.high == high:
+            high_inclusive = high_inclusive and other.high_inclusive
+
+        return Interval(low, low_inclusive, high, high_inclusive)
+
+    def contains(self, key: tuple) -> bool:
+        if self.low is not None and (key < self.low or key == self.low and not self.low_inclusive):
+            return False
+        if self.high is not None and (key > self.high or key == self.high and not self.high_inclusive):
+            return False
+        return True
+
+
+class Constraint:
+    """
+    Version constraint like '>=1.2.0,<2.0.0-rc.1'. Comma means 'and', '||' means 'or'.
+    Constraint is compiled to a sorted list of disjoint intervals of version sort keys
+    """
+    OPERATORS = ('==', '!=', '>=', '<=', '>', '<')
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.intervals = self._compile(spec)
+
+    def __repr__(self):
+        return f'Constraint({self.spec!r})'
+
+    def __contains__(self, version) -> bool:
+        return self.matches(version)
+
+    def matches(self, version) -> bool:
+        """
+        Check whether version (Version instance or string) satisfies constraint
+        """
+        key = version.key if isinstance(version, Version) else Version.key_of(version)
+        return any(interval.contains(key) for interval in self.intervals)
+
+    @classmethod
+    def _compile(cls, spec: str) -> List[Interval]:
+        intervals = []
+        for alternative in spec.split('||'):
+            alternative_intervals = [Interval()]
+            for clause in filter(None, map(str.strip, alternative.split(','))):
+                clause_intervals = cls._compile_clause(clause)
+                alternative_intervals = [
+                    intersection
+                    for interval in alternative_intervals
+                    for intersection in (interval.intersect(other) for other in clause_intervals)
+                    if not intersection.is_empty()
+                ]
+            intervals.extend(alternative_intervals)
+        return cls._merge(intervals)
+
+    @classmethod
+    def _compile_clause(cls, clause: str) -> List[Interval]:
+        for operator in cls.OPERATORS:
+            if clause.startswith(operator):
+                key = Version.key_of(clause[len(operator):].strip())
+                break
+        else:
+            operator, key = '==', Version.key_of(clause)
+
+        if operator == '==':
+            return [Interval(key, True, key, True)]
+        if operator == '!=':
+            return [Interval(None, False, key, False), Interval(key, False, None, False)]
+        if operator == '>=':
+            return [Interval(key, True)]
+        if operator == '>':
+            return [Interval(key, False)]
+        if operator == '<=':
+            return [Interval(high=key, high_inclusive=True)]
+        return [Interval(high=key, high_inclusive=False)]
+
+    @staticmethod
+    def _merge(intervals: List[Interval]) -> List[Interval]:
+        """
+        Sort intervals by lower bound and merge overlapping ones
+        """
+        def low_order(interval: Interval):
+            return (interval.low is not None, interval.low or (), not interval.low_inclusive)
+
+        merged = []
+        for interval in sorted(intervals, key=low_order):
+            if merged:
+                last = merged[-1]
+                overlaps = (
+                    last.high is None
+                    or interval.low is None
+                    or interval.low < last.high
+                    or interval.low == last.high and (interval.low_inclusive or last.high_inclusive)
+                )
+                if overlaps:
+                    if last.high is None or interval.high is None:
+                        high, high_inclusive = None, False
+                    elif interval.high > last.high:
+                        high, high_inclusive = interval.high, interval.high_inclusive
+                    elif interval.high == last.high:
+                        high, high_inclusive = last.high, last.high_inclusive or interval.high_inclusive
+                    else:
+                        high, high_inclusive = last.high, last.high_inclusive
+                    merged[-1] = Interval(last.low, last.low_inclusive, high, high_inclusive)
+                    continue
+            merged.append(interval)
+        return merged
+
+
+class VersionIndex:
+    """
+    Sorted index of version strings. Answers constraint queries with bisection,
+    so every query costs O(log n) per interval of the constraint
+    """
+    def __init__(self, versions: Iterable[str] = ()):
+        self.versions = Version.sort_many(versions)
+        self.keys = [Version.key_of(version) for version in self.versions]
+
+    def __len__(self):
+        return len(self.versions)
+
+    def add(self, version: str) -> None:
+        """
+        Insert single version keeping index sorted
+        """
+        key = Version.key_of(version)
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.versions.insert(position, version)
+
+    def _bounds(self, interval: Interval) -> range:
+        if interval.low is None:
+            start = 0
+        elif interval.low_inclusive:
+            start = bisect_left(self.keys, interval.low)
+        else:
+            start = bisect_right(self.keys, interval.low)
+
+        if interval.high is None:
+            stop = len(self.keys)
+        elif interval.high_inclusive:
+            stop = bisect_right(self.keys, interval.high)
+        else:
+            stop = bisect_left(self.keys, interval.high)
+        return range(start, max(start, stop))
+
+    def satisfying(self, constraint) -> List[str]:
+        """
+        All versions satisfying constraint (Constraint instance or its string spec) in ascending order
+        """
+        if not isinstance(constraint, Constraint):
+            constraint = Constraint(constraint)
+        result = []
+        for interval in constraint.intervals:
+            bounds = self._bounds(interval)
+            result.extend(self.versions[bounds.start:bounds.stop])
+        return result
+
+    def highest(self, constraint) -> Optional[str]:
+        """
+        Highest version satisfying constraint or None if there is no such version
+        """
+        if not isinstance(constraint, Constraint):
+            constraint = Constraint(constraint)
+        for interval in reversed(constraint.intervals):
+            bounds = self._bounds(interval)
+            if bounds:
+                return self.versions[bounds[-1]]
+        return None
+
+    def lowest(self, constraint) -> Optional[str]:
+        """
+        Lowest version satisfying constraint or None if there is no such version
+        """
+        if not isinstance(constraint, Constraint):
+            constraint = Constraint(constraint)
+        for interval in constraint.intervals:
+            bounds = self._bounds(interval)
+            if bounds:
+                return self.versions[bounds[0]]
+        return None
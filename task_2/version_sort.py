@@ -0,0 +1,155 @@
+import argparse
+import heapq
+import os
+import sys
+import tempfile
+from itertools import islice
+from typing import IO, Iterable, Iterator, List
+
+from task_2 import Version
+
+BUFFER_SIZE = 1 << 20
+
+
+def sort_key(version: str) -> tuple:
+    """
+    Version precedence first, then the string itself, so equal strings always end up next to each other
+    """
+    return Version.key_of(version), version
+
+
+def read_versions(files: Iterable[IO]) -> Iterator[str]:
+    for file in files:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def unique(versions: Iterable[str]) -> Iterator[str]:
+    """
+    Drop repeated strings from already sorted stream
+    """
+    previous = None
+    for version in versions:
+        if version != previous:
+            yield version
+            previous = version
+
+
+class ExternalVersionSorter:
+    """
+    Sorts version streams that do not fit in memory: sorts chunks in memory with precomputed keys,
+    spills them to disk as sorted runs and k-way merges the runs. At most 'fan_in' runs are merged at once,
+    so with more runs they are merged in several passes and the number of open files stays bounded
+    """
+    def __init__(self, chunk_size: int = 1000000, temp_dir: str = None, unique: bool = False, fan_in: int = 16):
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        if fan_in < 2:
+            raise ValueError('fan_in must be at least 2')
+        self.chunk_size = chunk_size
+        self.temp_dir = temp_dir
+        self.unique = unique
+        self.fan_in = fan_in
+
+    def sort_chunk(self, chunk: List[str]) -> List[str]:
+        versions = sorted(chunk, key=sort_key)
+        return list(unique(versions)) if self.unique else versions
+
+    def write_run(self, versions: Iterable[str], directory: str, number: int) -> str:
+        path = os.path.join(directory, f'run_{number}.txt')
+        with open(path, 'w', buffering=BUFFER_SIZE) as file:
+            file.writelines(f'{version}\n' for version in versions)
+        return path
+
+    def merge_runs(self, runs: List[str], output: IO) -> None:
+        files = [open(path, buffering=BUFFER_SIZE) for path in runs]
+        try:
+            merged = heapq.merge(*(map(str.rstrip, file) for file in files), key=sort_key)
+            if self.unique:
+                merged = unique(merged)
+            output.writelines(f'{version}\n' for version in merged)
+        finally:
+            for file in files:
+                file.close()
+
+    def sort(self, versions: Iterable[str], output: IO) -> None:
+        """
+        Sort versions and write them to output, one per line
+        """
+        versions = iter(versions)
+        first_chunk = self.sort_chunk(list(islice(versions, self.chunk_size)))
+        second_chunk = list(islice(versions, self.chunk_size))
+        if not second_chunk:
+            #  Everything fits in one chunk, no need to touch the disk
+            output.writelines(f'{version}\n' for version in first_chunk)
+            return
+
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as directory:
+            runs = [self.write_run(first_chunk, directory, 0)]
+            del first_chunk
+            chunk = second_chunk
+            while chunk:
+                runs.append(self.write_run(self.sort_chunk(chunk), directory, len(runs)))
+                chunk = list(islice(versions, self.chunk_size))
+
+            run_number = len(runs)
+            while len(runs) > self.fan_in:
+                merged_runs = []
+                for start in range(0, len(runs), self.fan_in):
+                    group = runs[start:start + self.fan_in]
+                    path = os.path.join(directory, f'run_{run_number}.txt')
+                    run_number += 1
+                    with open(path, 'w', buffering=BUFFER_SIZE) as file:
+                        self.merge_runs(group, file)
+                    for merged_path in group:
+                        os.remove(merged_path)
+                    merged_runs.append(path)
+                runs = merged_runs
+            self.merge_runs(runs, output)
+
+
+class CLI:
+    """
+    CLI util for version sorting parameters
+    """
+    @classmethod
+    def get_args(cls) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            description='Sorts version strings (one per line) from files or stdin according to Version precedence. '
+                        'Lists larger than memory are sorted in chunks, spilled to disk and merged')
+        parser.add_argument('files', nargs='*', help='Files with versions. Reads stdin if not given')
+        parser.add_argument('--output', '-o', help='Output file. Defaults to stdout')
+        parser.add_argument('--unique', '-u', action='store_true', help='Output every version string only once')
+        parser.add_argument('--chunk-size', type=int, default=1000000,
+                            help='Number of versions sorted in memory at once. Defaults to 1000000')
+        parser.add_argument('--temp-dir', help='Directory for sorted runs. Defaults to system temp directory')
+        parser.add_argument('--fan-in', type=int, default=16,
+                            help='Maximal number of sorted runs merged (and opened) at once. Defaults to 16')
+        args = parser.parse_args()
+        if args.chunk_size < 1:
+            parser.error('--chunk-size must be at least 1')
+        if args.fan_in < 2:
+            parser.error('--fan-in must be at least 2')
+        return args
+
+
+def main():
+    args = CLI.get_args()
+    sorter = ExternalVersionSorter(args.chunk_size, args.temp_dir, args.unique, args.fan_in)
+
+    inputs = [open(path, buffering=BUFFER_SIZE) for path in args.files] or [sys.stdin]
+    output = open(args.output, 'w', buffering=BUFFER_SIZE) if args.output else sys.stdout
+    try:
+        sorter.sort(read_versions(inputs), output)
+    finally:
+        for file in inputs:
+            if file is not sys.stdin:
+                file.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
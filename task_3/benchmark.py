@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from statistics import quantiles
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from task_3 import (
+    ResourceAccumulator, SharedMemoryResource, SharedResource, StripedCounter,
+    process_resource_state_change, resource_state_change,
+)
+
+#  Strategy returns final value and per-update latencies (None if they can not be measured)
+StrategyResult = Tuple[int, Optional[List[float]]]
+
+
+def run_in_threads(workers: int, work: Callable[[int], List[float]]) -> List[float]:
+    """
+    Run work in every thread of the pool and collect latencies measured by them
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(work, worker) for worker in range(workers)]
+        return [latency for future in futures for latency in future.result()]
+
+
+def single_lock(workers: int, updates: int, arg: int) -> StrategyResult:
+    lock = Lock()
+    resource = SharedResource()
+
+    def work(_) -> List[float]:
+        latencies = []
+        for _ in range(updates):
+            start = perf_counter()
+            resource_state_change(arg, lock, resource)
+            latencies.append(perf_counter() - start)
+        return latencies
+
+    latencies = run_in_threads(workers, work)
+    return resource.value, latencies
+
+
+def striped_counters(workers: int, updates: int, arg: int) -> StrategyResult:
+    counter = StripedCounter()
+
+    def work(_) -> List[float]:
+        latencies = []
+        for _ in range(updates):
+            start = perf_counter()
+            counter.add(arg)
+            latencies.append(perf_counter() - start)
+        return latencies
+
+    latencies = run_in_threads(workers, work)
+    return counter.value, latencies
+
+
+def thread_local_batching(workers: int, updates: int, arg: int) -> StrategyResult:
+    resource = SharedResource()
+    accumulator = ResourceAccumulator(resource, Lock())
+
+    def work(_) -> List[float]:
+        latencies = []
+        for _ in range(updates):
+            start = perf_counter()
+            accumulator.add(arg)
+            latencies.append(perf_counter() - start)
+        accumulator.flush()
+        return latencies
+
+    latencies = run_in_threads(workers, work)
+    return resource.value, latencies
+
+
+def asyncio_tasks(workers: int, updates: int, arg: int) -> StrategyResult:
+    resource = SharedResource()
+
+    async def work(lock: asyncio.Lock, latencies: List[float]) -> None:
+        for _ in range(updates):
+            start = perf_counter()
+            async with lock:
+                resource.value += arg
+            latencies.append(perf_counter() - start)
+            #  Let other tasks interleave, as threads do
+            await asyncio.sleep(0)
+
+    async def run() -> List[float]:
+        lock = asyncio.Lock()
+        latencies = []
+        await asyncio.gather(*(work(lock, latencies) for _ in range(workers)))
+        return latencies
+
+    latencies = asyncio.run(run())
+    return resource.value, latencies
+
+
+def process_pool(workers: int, updates: int, arg: int) -> StrategyResult:
+    with SharedMemoryResource(slots=workers) as resource:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_resource_state_change, arg, updates, slot, resource.name)
+                for slot in range(workers)
+            ]
+            for future in futures:
+                future.result()
+        return resource.value, None
+
+
+STRATEGIES: Dict[str, Callable[[int, int, int], StrategyResult]] = {
+    'single_lock': single_lock,
+    'striped': striped_counters,
+    'thread_local': thread_local_batching,
+    'asyncio': asyncio_tasks,
+    'process_pool': process_pool,
+}
+
+
+def run_benchmark(strategy: str, workers: int, total: int, granularity: int) -> dict:
+    """
+    Add 'total' to resource with updates of 'granularity' size, split between workers
+    """
+    updates = total // granularity // workers
+    expected = updates * granularity * workers
+
+    start = perf_counter()
+    value, latencies = STRATEGIES[strategy](workers, updates, granularity)
+    elapsed = perf_counter() - start
+
+    row = {
+        'strategy': strategy,
+        'workers': workers,
+        'granularity': granularity,
+        'updates/s': updates * workers / elapsed,
+        'p50, us': '-',
+        'p99, us': '-',
+        'correct': value == expected,
+    }
+    if latencies and len(latencies) > 1:
+        percentiles = quantiles(latencies, n=100)
+        row['p50, us'] = percentiles[49] * 1e6
+        row['p99, us'] = percentiles[98] * 1e6
+    return row
+
+
+def format_value(value) -> str:
+    if isinstance(value, float):
+        return f'{value:,.0f}' if value >= 100 else f'{value:.2f}'
+    return str(value)
+
+
+def print_table(rows: List[dict]) -> None:
+    columns = list(rows[0].keys())
+    widths = [max(len(column), *(len(format_value(row[column])) for row in rows)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(format_value(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+class CLI:
+    """
+    CLI util for benchmark parameters
+    """
+    @classmethod
+    def get_args(cls) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            description='Runs the same SharedResource update workload under different concurrency strategies')
+        parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES),
+                            help='Strategies to run. Defaults to all of them')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                            help='Numbers of workers. Defaults to 1 2 4 8 16 32 64')
+        parser.add_argument('--granularities', type=int, nargs='+', default=[1, 100],
+                            help='Values added by a single update. Defaults to 1 100')
+        parser.add_argument('--total', type=int, default=1000000,
+                            help='Value added to resource by all updates together. Defaults to 1000000')
+        return parser.parse_args()
+
+
+def main():
+    args = CLI.get_args()
+    rows = [
+        run_benchmark(strategy, workers, args.total, granularity)
+        for granularity in args.granularities
+        for workers in args.workers
+        for strategy in args.strategies
+    ]
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,11 @@
-from threading import Lock
-from concurrent.futures import ThreadPoolExecutor
+import struct
+from bisect import bisect_right
+from itertools import count
+from threading import Lock, local
+from time import perf_counter, sleep
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Tuple
 
 
 class SharedResource:
@@ -7,18 +13,306 @@ class SharedResource:
         self.value = value
 
 
+class SeqlockResource(SharedResource):
+    """
+    SharedResource with seqlock-protected snapshot reads. Writers are serialized by the write lock and make
+    the sequence odd while they write. Readers never take a lock: they retry until they read the same even
+    sequence before and after reading the value, so they neither block nor starve writers
+    """
+    def __init__(self, value=0):
+        self._write_lock = Lock()
+        self._sequence = 0
+        self._value = value
+
+    def snapshot(self) -> Tuple[int, int]:
+        """
+        Consistent (value, version) pair. Version grows by 2 with every write
+        """
+        while True:
+            sequence = self._sequence
+            if sequence % 2:
+                #  Write is in progress, let the writer finish
+                sleep(0)
+                continue
+            value = self._value
+            if self._sequence == sequence:
+                return value, sequence
+
+    @property
+    def value(self):
+        return self.snapshot()[0]
+
+    @value.setter
+    def value(self, value):
+        with self._write_lock:
+            self._sequence += 1
+            self._value = value
+            self._sequence += 1
+
+    def add(self, arg: int) -> None:
+        """
+        Atomic read-modify-write
+        """
+        with self._write_lock:
+            self._sequence += 1
+            self._value += arg
+            self._sequence += 1
+
+
+class ResourceAccumulator:
+    """
+    Accumulates updates of SharedResource in per-thread sub-counters, so threads do not contend on every update.
+    Sub-counter is merged into resource under the shared lock once per batch, reads merge not yet flushed sub-counters
+    """
+    def __init__(self, resource: SharedResource, lock: Lock, batch_size: int = 1000):
+        self.resource = resource
+        self.lock = lock
+        self.batch_size = batch_size
+        self._local = local()
+        self._counters = []
+        self._counters_lock = Lock()
+
+    def _counter(self) -> list:
+        """
+        Sub-counter of current thread: [pending sum, number of pending updates]
+        """
+        try:
+            return self._local.counter
+        except AttributeError:
+            counter = self._local.counter = [0, 0]
+            with self._counters_lock:
+                self._counters.append(counter)
+            return counter
+
+    def add(self, arg: int) -> None:
+        counter = self._counter()
+        counter[0] += arg
+        counter[1] += 1
+        if counter[1] >= self.batch_size:
+            self._flush(counter)
+
+    def flush(self) -> None:
+        """
+        Merge sub-counter of current thread into resource
+        """
+        self._flush(self._counter())
+
+    def _flush(self, counter: list) -> None:
+        with self.lock:
+            self.resource.value += counter[0]
+            counter[0] = 0
+            counter[1] = 0
+
+    @property
+    def value(self) -> int:
+        """
+        Resource value together with all pending updates
+        """
+        with self.lock, self._counters_lock:
+            return self.resource.value + sum(counter[0] for counter in self._counters)
+
+
+class StripedCounter:
+    """
+    Counter split into stripes, every one guarded by its own lock. Threads are assigned to stripes round-robin,
+    so threads contend only when they share a stripe. Reads sum all stripes
+    """
+    def __init__(self, value: int = 0, stripes: int = 16):
+        self.base = value
+        self._stripes = [[0, Lock()] for _ in range(stripes)]
+        self._next_stripe = count()
+        self._local = local()
+
+    def add(self, arg: int) -> None:
+        try:
+            stripe = self._local.stripe
+        except AttributeError:
+            stripe = self._local.stripe = self._stripes[next(self._next_stripe) % len(self._stripes)]
+        with stripe[1]:
+            stripe[0] += arg
+
+    @property
+    def value(self) -> int:
+        return self.base + sum(stripe[0] for stripe in self._stripes)
+
+
+class InstrumentedLock:
+    """
+    Drop-in replacement for Lock, which records acquire wait time, hold time, number of acquisitions
+    and histogram of wait times. Stats are updated only while the lock is held, so they need no extra locking
+    """
+    #  Upper bounds of histogram buckets, in seconds
+    HISTOGRAM_BOUNDS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1)
+
+    def __init__(self, name: str = 'lock'):
+        self.name = name
+        self._lock = Lock()
+        self._acquired_at = 0.0
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.hold_time = 0.0
+        self.max_hold_time = 0.0
+        self.histogram = [0] * (len(self.HISTOGRAM_BOUNDS) + 1)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = perf_counter()
+        acquired = self._lock.acquire(False)
+        contended = not acquired
+        if not acquired and blocking:
+            acquired = self._lock.acquire(True, timeout)
+        if not acquired:
+            return False
+
+        self._acquired_at = perf_counter()
+        wait = self._acquired_at - start
+        self.acquisitions += 1
+        self.contended += contended
+        self.wait_time += wait
+        self.max_wait_time = max(self.max_wait_time, wait)
+        self.histogram[bisect_right(self.HISTOGRAM_BOUNDS, wait)] += 1
+        return True
+
+    def release(self) -> None:
+        hold = perf_counter() - self._acquired_at
+        self.hold_time += hold
+        self.max_hold_time = max(self.max_hold_time, hold)
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def report(self) -> str:
+        """
+        Human readable stats
+        """
+        acquisitions = self.acquisitions or 1
+        labels = [f'<{bound * 1e6:g}us' for bound in self.HISTOGRAM_BOUNDS]
+        labels.append(f'>={self.HISTOGRAM_BOUNDS[-1] * 1e6:g}us')
+        lines = [
+            f'{self.name}: {self.acquisitions} acquisitions, {self.contended} contended',
+            f'    wait: total {self.wait_time:.6f}s, avg {self.wait_time / acquisitions:.9f}s, '
+            f'max {self.max_wait_time:.6f}s',
+            f'    hold: total {self.hold_time:.6f}s, avg {self.hold_time / acquisitions:.9f}s, '
+            f'max {self.max_hold_time:.6f}s',
+            '    wait histogram: ' + ', '.join(f'{label} {count}' for label, count in zip(labels, self.histogram)),
+        ]
+        return '\n'.join(lines)
+
+
+class SharedMemoryResource:
+    """
+    SharedResource for process pools. Value lives in multiprocessing.shared_memory as base value plus one
+    int64 slot per worker task: every process writes its partial sum into its own slot, so no lock is needed,
+    and reading the value reduces all slots
+    """
+    SLOT = struct.Struct('q')
+
+    def __init__(self, value: int = 0, slots: int = 1):
+        self.slots = slots
+        self.memory = shared_memory.SharedMemory(create=True, size=self.SLOT.size * (slots + 1))
+        self.SLOT.pack_into(self.memory.buf, 0, value)
+        for slot in range(slots):
+            self.store(self.memory, slot, 0)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @classmethod
+    def store(cls, memory: shared_memory.SharedMemory, slot: int, value: int) -> None:
+        cls.SLOT.pack_into(memory.buf, cls.SLOT.size * (slot + 1), value)
+
+    @property
+    def value(self) -> int:
+        return sum(value for value, in self.SLOT.iter_unpack(self.memory.buf))
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def resource_state_change(arg: int, lock: Lock, resource: SharedResource):
     with lock:
         resource.value += arg
 
 
+def accumulated_resource_state_change(arg: int, updates: int, accumulator: ResourceAccumulator):
+    for _ in range(updates):
+        accumulator.add(arg)
+    accumulator.flush()
+
+
+def process_resource_state_change(arg: int, updates: int, slot: int, memory_name: str):
+    """
+    Runs in a worker process: accumulates partial sum locally and publishes it into its own slot once
+    """
+    partial = 0
+    for _ in range(updates):
+        partial += arg
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        SharedMemoryResource.store(memory, slot, partial)
+    finally:
+        memory.close()
+
+
 def main():
-    lock = Lock()
+    lock = InstrumentedLock('resource_state_change lock')
     shared_resource = SharedResource()
     with ThreadPoolExecutor(max_workers=5) as executor:
         for _ in range(5):
             executor.submit(resource_state_change, 1000000, lock, shared_resource)
     print("----------------------", shared_resource.value)
 
+    #  Same result with many fine-grained updates, which take the lock only once per batch
+    accumulated_resource = SharedResource()
+    accumulator = ResourceAccumulator(accumulated_resource, Lock())
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        for _ in range(5):
+            executor.submit(accumulated_resource_state_change, 10, 100000, accumulator)
+    print("----------------------", accumulated_resource.value)
+
+    #  Monitoring reader does not block writers, which update resource through the usual lock
+    seqlock_resource = SeqlockResource()
+    seqlock_writers_lock = InstrumentedLock('seqlock writers lock')
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        reads = executor.submit(lambda: [seqlock_resource.snapshot() for _ in range(10000)])
+        for _ in range(5):
+            executor.submit(resource_state_change, 1000000, seqlock_writers_lock, seqlock_resource)
+    assert all(value == sequence // 2 * 1000000 for value, sequence in reads.result()), "inconsistent snapshot"
+    print("----------------------", seqlock_resource.value)
+
+    #  CPU-bound updates in separate processes, reduced from shared memory
+    with SharedMemoryResource(slots=5) as memory_resource:
+        with ProcessPoolExecutor(max_workers=5) as executor:
+            futures = [
+                executor.submit(process_resource_state_change, 10, 100000, slot, memory_resource.name)
+                for slot in range(5)
+            ]
+            for future in futures:
+                future.result()
+        print("----------------------", memory_resource.value)
+
+    #  Contention of every instrumented lock over the whole run
+    for instrumented_lock in (lock, seqlock_writers_lock):
+        print(instrumented_lock.report())
+
 
-main()
+if __name__ == '__main__':
+    main()
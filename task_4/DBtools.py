@@ -0,0 +1,428 @@
+import hashlib
+import json
+import os
+import pymysql
+import sqlite3
+from contextlib import contextmanager
+from itertools import islice
+from queue import Empty, LifoQueue
+from threading import BoundedSemaphore
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+def read_queries(path: str) -> List[str]:
+    """
+    Read queries, separated by empty lines
+    """
+    with open(path) as file:
+        return list(map(lambda s: s.replace('\n', ''), file.read().split('\n\n')))
+
+
+def read_named_queries(path: str) -> Dict[str, str]:
+    """
+    Read queries and their names, separated by '#'
+    """
+    named_queries = {}
+    for query_and_name in read_queries(path):
+        query_name = query_and_name[1:query_and_name.rfind('#')]
+        named_queries[query_name] = query_and_name[query_and_name.rfind('#') + 1:]
+    return named_queries
+
+
+class ConnectionFailed(Exception):
+    """
+    Database is not reachable: connection to it could not be opened
+    """
+
+
+class ConnectionPool:
+    """
+    Lazily created pool of database connections.
+    Connections are opened on first demand (so creating the pool never touches the database), checked
+    before being borrowed if they were idle for too long and reopened if the check fails
+    """
+    def __init__(self, size: int = 4, health_check_interval: float = 30):
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._idle = LifoQueue()
+        self._slots = BoundedSemaphore(size)
+
+    def connect(self) -> Any:
+        """
+        Open new connection. Raises ConnectionFailed if it could not be opened
+        """
+        raise NotImplementedError
+
+    def is_alive(self, connection: Any) -> bool:
+        """
+        Check connection health, reconnecting it if possible
+        """
+        raise NotImplementedError
+
+    def reset(self, connection: Any) -> None:
+        """
+        Bring connection returned to the pool to clean state
+        """
+        pass
+
+    def _acquire(self) -> Any:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection, released_at = self._idle.get_nowait()
+                except Empty:
+                    return self.connect()
+                if monotonic() - released_at < self.health_check_interval or self.is_alive(connection):
+                    return connection
+                self._close(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, connection: Any, broken: bool = False) -> None:
+        try:
+            if broken:
+                self._close(connection)
+            else:
+                self.reset(connection)
+                self._idle.put((connection, monotonic()))
+        except Exception:
+            self._close(connection)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrow connection from the pool. Blocks while all 'size' connections are borrowed
+        """
+        connection = self._acquire()
+        try:
+            yield connection
+        except BaseException:
+            #  Connection could be left in the middle of transaction or broken, so it is not reused
+            self._release(connection, broken=True)
+            raise
+        self._release(connection)
+
+    def close(self) -> None:
+        """
+        Close all idle connections
+        """
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close(connection)
+
+
+class MysqlConnectionPool(ConnectionPool):
+    """
+    Pool of pymysql connections
+    """
+    def __init__(self, connection_params: dict, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_params = connection_params
+
+    def connect(self) -> pymysql.Connection:
+        try:
+            return pymysql.connect(**self.connection_params)
+        except pymysql.err.MySQLError as error:
+            raise ConnectionFailed(error) from error
+
+    def reset(self, connection: pymysql.Connection) -> None:
+        #  Finish transaction, which could be left open by reads, so the next borrower does not see old snapshot
+        connection.rollback()
+
+    def is_alive(self, connection: pymysql.Connection) -> bool:
+        try:
+            connection.ping(reconnect=True)
+        except pymysql.err.Error:
+            return False
+        return True
+
+
+class SqliteConnection:
+    """
+    Wraps sqlite3 connection to look like pymysql one with DictCursor: cursors are context managers
+    and rows are fetched as dicts
+    """
+    class Cursor:
+        def __init__(self, cursor: sqlite3.Cursor):
+            self._cursor = cursor
+
+        def __getattr__(self, name):
+            return getattr(self._cursor, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self._cursor.close()
+
+        def __iter__(self):
+            return iter(self._cursor)
+
+    def __init__(self, database: str):
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        self._connection.row_factory = self.dict_factory
+        self._connection.execute('PRAGMA foreign_keys = ON')
+
+    @staticmethod
+    def dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+        return {column[0]: value for column, value in zip(cursor.description, row)}
+
+    def cursor(self, cursor_class: type = None) -> 'SqliteConnection.Cursor':
+        """
+        sqlite3 cursors always fetch rows lazily, so 'cursor_class' (like pymysql SSDictCursor) is ignored
+        """
+        return self.Cursor(self._connection.cursor())
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class SqliteConnectionPool(ConnectionPool):
+    """
+    Pool of connections to embedded SQLite database file
+    """
+    def __init__(self, database: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.database = database
+
+    def connect(self) -> SqliteConnection:
+        try:
+            return SqliteConnection(self.database)
+        except sqlite3.Error as error:
+            raise ConnectionFailed(error) from error
+
+    def reset(self, connection: SqliteConnection) -> None:
+        connection.rollback()
+
+    def is_alive(self, connection: SqliteConnection) -> bool:
+        try:
+            connection.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+
+class Backend:
+    """
+    Database backend: connection pool together with sql files written in its dialect
+    """
+    SETUP_TABLES_QUERIES = 'setup_tables.sql'
+    #  Named queries, adding columns missing in tables created by older setup_tables.sql
+    MIGRATE_TABLES_QUERIES = 'migrate_tables.sql'
+    SETUP_ROOM_STATS_QUERIES = 'setup_room_stats.sql'
+    FILL_TABLES_QUERIES = 'fill_tables.sql'
+    STATS_QUERIES = 'statistics.sql'
+    SYNC_TABLES_QUERIES = 'sync_tables.sql'
+    #  Named queries, reading and recording checksum of data loaded into tables
+    LOADED_DATA_QUERIES = 'loaded_data.sql'
+    #  Optional file with bulk loading queries
+    BULK_LOAD_TABLES_QUERIES = None
+
+    def __init__(self, connection_pool: ConnectionPool, sql_directory: str = '', loader_threads: int = 1,
+                 ingest_connection_pool: ConnectionPool = None):
+        self.connection_pool = connection_pool
+        #  Pool of connections, which load data into tables. Defaults to 'connection_pool'
+        self.ingest_connection_pool = ingest_connection_pool or connection_pool
+        self.sql_directory = sql_directory
+        self.loader_threads = loader_threads
+
+    def sql_path(self, file_name: str) -> str:
+        return os.path.join(self.sql_directory, file_name)
+
+    @property
+    def setup_tables(self) -> str:
+        return self.sql_path(self.SETUP_TABLES_QUERIES)
+
+    @property
+    def migrate_tables(self) -> str:
+        return self.sql_path(self.MIGRATE_TABLES_QUERIES)
+
+    @property
+    def setup_room_stats(self) -> str:
+        return self.sql_path(self.SETUP_ROOM_STATS_QUERIES)
+
+    @property
+    def fill_tables(self) -> str:
+        return self.sql_path(self.FILL_TABLES_QUERIES)
+
+    @property
+    def stats_queries(self) -> str:
+        return self.sql_path(self.STATS_QUERIES)
+
+    @property
+    def sync_tables(self) -> str:
+        return self.sql_path(self.SYNC_TABLES_QUERIES)
+
+    @property
+    def loaded_data(self) -> str:
+        return self.sql_path(self.LOADED_DATA_QUERIES)
+
+    @property
+    def bulk_load_tables(self) -> str:
+        return self.BULK_LOAD_TABLES_QUERIES and self.sql_path(self.BULK_LOAD_TABLES_QUERIES)
+
+    def get_profiler(self) -> 'QueryProfiler':
+        """
+        Profiler of queries, which knows how to explain them in this dialect
+        """
+        raise NotImplementedError
+
+
+class MysqlBackend(Backend):
+    """
+    Its room statistics are maintained by triggers, so with binary logging enabled (MySQL 8.0 default)
+    the user must have SUPER privilege or server must run with 'log_bin_trust_function_creators = 1'
+    """
+    BULK_LOAD_TABLES_QUERIES = 'load_tables.sql'
+
+    def get_profiler(self) -> 'QueryProfiler':
+        return QueryProfiler(
+            'EXPLAIN ',
+            "SHOW SESSION STATUS WHERE Variable_name LIKE 'Handler_read%' OR Variable_name LIKE 'Created_tmp%'"
+        )
+
+
+class SqliteBackend(Backend):
+    """
+    Embedded backend, running everything in-process. STD() is emulated in its statistics.sql with
+    AVG(x * x) - AVG(x) * AVG(x), which orders rooms the same way
+    """
+    def __init__(self, connection_pool: SqliteConnectionPool, sql_directory: str = 'sqlite'):
+        #  SQLite serializes writers, so parallel loaders would only wait for each other
+        super().__init__(connection_pool, sql_directory, loader_threads=1)
+
+    def get_profiler(self) -> 'QueryProfiler':
+        #  SQLite has no session status counters
+        return QueryProfiler('EXPLAIN QUERY PLAN ')
+
+
+class ResultCache:
+    """
+    On-disk cache of query results. Results are keyed by checksum of loaded data together with query text,
+    so they stay valid until tables are loaded with other data, which invalidates the whole cache
+    """
+    DATA_CHECKSUM_FILE = 'data_checksum'
+    CHECKSUM_BATCH_SIZE = 1000
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @classmethod
+    def checksum(cls, *tables: Iterable[Any]) -> str:
+        """
+        Checksum of tables of json serializable rows. Rows are hashed in batches, so whole data is never serialized
+        at once
+        """
+        data_hash = hashlib.sha256()
+        for table in tables:
+            rows = iter(table)
+            for batch in iter(lambda: list(islice(rows, cls.CHECKSUM_BATCH_SIZE)), []):
+                data_hash.update(json.dumps(batch, default=str).encode())
+                data_hash.update(b'\n')
+            #  Separate tables, so rows moved from one table to other change checksum
+            data_hash.update(b'\0')
+        return data_hash.hexdigest()
+
+    @property
+    def data_checksum(self) -> Optional[str]:
+        """
+        Checksum of data currently loaded into database or None if it is unknown
+        """
+        try:
+            with open(os.path.join(self.directory, self.DATA_CHECKSUM_FILE)) as file:
+                return file.read() or None
+        except FileNotFoundError:
+            return None
+
+    def invalidate(self, data_checksum: str = None) -> None:
+        """
+        Drop all cached results and remember checksum of newly loaded data
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.json'):
+                os.remove(os.path.join(self.directory, file_name))
+        with open(os.path.join(self.directory, self.DATA_CHECKSUM_FILE), 'w') as file:
+            file.write(data_checksum or '')
+
+    def _path(self, data_checksum: str, query: str) -> str:
+        key = hashlib.sha256(f'{data_checksum}\n{query}'.encode()).hexdigest()
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, query: str) -> Optional[list]:
+        data_checksum = self.data_checksum
+        if data_checksum is None:
+            return None
+        try:
+            with open(self._path(data_checksum, query)) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, query: str, rows: list) -> None:
+        data_checksum = self.data_checksum
+        if data_checksum is None:
+            return
+        path = self._path(data_checksum, query)
+        #  Write to temporary file first, so concurrent readers never see partial result
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(rows, file, default=str)
+        os.replace(f'{path}.tmp', path)
+
+
+class QueryProfiler:
+    """
+    Executes queries, collecting their wall time, number of returned rows, deltas of session status counters
+    (if 'status_query' is given) and EXPLAIN output into 'report'
+    """
+    def __init__(self, explain_prefix: str = 'EXPLAIN ', status_query: str = None):
+        self.explain_prefix = explain_prefix
+        self.status_query = status_query
+        self.report: Dict[str, dict] = {}
+
+    def session_status(self, cursor: Any) -> Dict[str, int]:
+        cursor.execute(self.status_query)
+        return {row['Variable_name']: int(row['Value']) for row in cursor.fetchall()}
+
+    def profile(self, cursor: Any, query_name: str, query: str) -> list:
+        """
+        Execute query and report about it. Returns fetched rows
+        """
+        status_before = self.session_status(cursor) if self.status_query else {}
+        start = perf_counter()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        wall_time = perf_counter() - start
+        status_after = self.session_status(cursor) if self.status_query else {}
+
+        cursor.execute(self.explain_prefix + query)
+        self.report[query_name] = {
+            'query': query,
+            'wall_time': wall_time,
+            'rows_returned': len(rows),
+            'status_deltas': {name: value - status_before.get(name, 0) for name, value in status_after.items()},
+            'explain': cursor.fetchall(),
+        }
+        return rows
+
+    def mark_cached(self, query_name: str, query: str) -> None:
+        self.report[query_name] = {'query': query, 'cached': True}
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.report, file, indent=4, ensure_ascii=False, default=str)
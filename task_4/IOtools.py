@@ -164,9 +164,9 @@ class CLI:
     AVAILABLE_EXTENSIONS = ['json', 'xml']
 
     @classmethod
-    def get_args(cls) -> argparse.Namespace:
+    def get_parser(cls) -> argparse.ArgumentParser:
         """
-        Get CLI arguments
+        Parser of CLI arguments. Override it to add new arguments
         """
         parser = argparse.ArgumentParser(
             description='Given paths to input json files, fetches data from these files, '
@@ -176,7 +176,14 @@ class CLI:
         parser.add_argument('--format',
                             help='Format of output file (extension). Defaults to json',
                             choices=cls.AVAILABLE_EXTENSIONS, default='json')
-        args = parser.parse_args()
+        return parser
+
+    @classmethod
+    def get_args(cls) -> argparse.Namespace:
+        """
+        Get CLI arguments
+        """
+        args = cls.get_parser().parse_args()
         return args
 
 
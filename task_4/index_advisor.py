@@ -0,0 +1,186 @@
+import argparse
+import re
+from sys import exit
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import pymysql
+
+import DBtools
+from task_4 import FourthTask
+
+TABLE_ALIAS = re.compile(
+    r'(?:FROM|JOIN)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(?!(?:ON|INNER|LEFT|RIGHT|JOIN|WHERE|GROUP)\b)(\w+))?',
+    re.IGNORECASE
+)
+JOIN_CONDITION = re.compile(r'\bON\s+(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)', re.IGNORECASE)
+AGGREGATE = re.compile(r'\b(?:AVG|STD|STDDEV|SUM|MIN|MAX|COUNT)\s*\(\s*(?:DISTINCT\s+)?(?:(\w+)\.)?(\w+)\s*\)',
+                       re.IGNORECASE)
+
+Index = Tuple[str, Tuple[str, ...]]
+
+
+class IndexAdvisor:
+    """
+    Proposes covering indexes for named queries: for every joined table, index starts with its join column
+    and continues with the column aggregated by the query, so grouping and aggregation are answered from index.
+    Indexes already present in the table (or which are prefixes of existing ones) are not proposed
+    """
+    def __init__(self, named_queries: Dict[str, str], connection_pool: DBtools.ConnectionPool):
+        self.named_queries = named_queries
+        self.connection_pool = connection_pool
+        self.explains: Dict[str, List[dict]] = {}
+
+    def explain(self, cursor: pymysql.cursors.Cursor) -> None:
+        for name, query in self.named_queries.items():
+            cursor.execute(f'EXPLAIN {query}')
+            self.explains[name] = cursor.fetchall()
+
+    @staticmethod
+    def table_columns(cursor: pymysql.cursors.Cursor, table: str) -> List[str]:
+        cursor.execute(f'SHOW COLUMNS FROM `{table}`')
+        return [row['Field'] for row in cursor.fetchall()]
+
+    @staticmethod
+    def existing_indexes(cursor: pymysql.cursors.Cursor, table: str) -> List[Tuple[str, ...]]:
+        cursor.execute(f'SHOW INDEX FROM `{table}`')
+        indexes = {}
+        for row in cursor.fetchall():
+            indexes.setdefault(row['Key_name'], []).append((row['Seq_in_index'], row['Column_name']))
+        return [tuple(column for _, column in sorted(columns)) for columns in indexes.values()]
+
+    @staticmethod
+    def candidate_indexes(query: str, columns: Dict[str, List[str]]) -> List[Index]:
+        """
+        Indexes of (join column, aggregated column) for every table in the query
+        """
+        aliases = {}
+        for table, alias in TABLE_ALIAS.findall(query):
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+
+        join_columns = {}
+        for left_alias, left_column, right_alias, right_column in JOIN_CONDITION.findall(query):
+            join_columns.setdefault(aliases.get(left_alias, left_alias), left_column)
+            join_columns.setdefault(aliases.get(right_alias, right_alias), right_column)
+
+        candidates = []
+        for alias, column in AGGREGATE.findall(query):
+            if alias:
+                table = aliases.get(alias, alias)
+            else:
+                #  Unqualified column belongs to the only joined table having it
+                tables = [table for table in join_columns if column in columns.get(table, [])]
+                if len(tables) != 1:
+                    continue
+                table = tables[0]
+            join_column = join_columns.get(table)
+            if join_column is None:
+                continue
+            index_columns = (join_column,) if column == join_column else (join_column, column)
+            candidates.append((table, index_columns))
+        return candidates
+
+    def propose(self) -> List[Index]:
+        with self.connection_pool.connection() as connection, connection.cursor() as cursor:
+            self.explain(cursor)
+            tables = {table for query in self.named_queries.values() for table, _ in TABLE_ALIAS.findall(query)}
+            columns = {table: self.table_columns(cursor, table) for table in tables}
+            existing = {table: self.existing_indexes(cursor, table) for table in tables}
+
+        proposals = []
+        for query in self.named_queries.values():
+            for table, index_columns in self.candidate_indexes(query, columns):
+                covered = any(index[:len(index_columns)] == index_columns for index in existing[table])
+                if not covered and (table, index_columns) not in proposals:
+                    proposals.append((table, index_columns))
+        return proposals
+
+    @staticmethod
+    def index_name(table: str, columns: Tuple[str, ...]) -> str:
+        return f"idx_{table}_{'_'.join(columns)}"
+
+    @classmethod
+    def create_index_query(cls, table: str, columns: Tuple[str, ...]) -> str:
+        column_list = ', '.join(f'`{column}`' for column in columns)
+        return f'CREATE INDEX `{cls.index_name(table, columns)}` ON `{table}` ({column_list});'
+
+    def write(self, proposals: List[Index], path: str) -> None:
+        """
+        Write proposed indexes to sql file, queries are separated by empty lines as in other sql files
+        """
+        with open(path, 'w') as file:
+            file.write('\n\n'.join(self.create_index_query(table, columns) for table, columns in proposals))
+
+    def apply(self, proposals: List[Index]) -> None:
+        with self.connection_pool.connection() as connection, connection.cursor() as cursor:
+            for table, columns in proposals:
+                cursor.execute(self.create_index_query(table, columns))
+
+    def measure(self, repeat: int) -> Dict[str, float]:
+        """
+        Average execution time of every query, in seconds
+        """
+        timings = {}
+        with self.connection_pool.connection() as connection, connection.cursor() as cursor:
+            for name, query in self.named_queries.items():
+                start = perf_counter()
+                for _ in range(repeat):
+                    cursor.execute(query)
+                    cursor.fetchall()
+                timings[name] = (perf_counter() - start) / repeat
+        return timings
+
+
+class CLI:
+    """
+    CLI util for index advisor parameters
+    """
+    @classmethod
+    def get_args(cls) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            description='Runs EXPLAIN for named queries, proposes covering indexes for them and writes '
+                        'CREATE INDEX queries to sql file')
+        stats_queries = FourthTask.BACKENDS['mysql'].stats_queries
+        parser.add_argument('--queries', default=stats_queries,
+                            help=f'Path to named queries. Defaults to {stats_queries}')
+        parser.add_argument('--output', default='indexes.sql', help='Output sql file. Defaults to indexes.sql')
+        parser.add_argument('--apply', action='store_true',
+                            help='Create proposed indexes and report query timings before and after')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Number of runs of every query for timings. Defaults to 5')
+        return parser.parse_args()
+
+
+def main():
+    args = CLI.get_args()
+    advisor = IndexAdvisor(DBtools.read_named_queries(args.queries), FourthTask.MYSQL_POOL)
+    try:
+        proposals = advisor.propose()
+        for name, rows in advisor.explains.items():
+            print(name)
+            for row in rows:
+                print(f"    {row['table']}: type={row['type']}, key={row['key']}, rows={row['rows']}, "
+                      f"extra={row['Extra']}")
+
+        advisor.write(proposals, args.output)
+        print(f'\n{len(proposals)} indexes written to {args.output}')
+        for table, columns in proposals:
+            print('   ', advisor.create_index_query(table, columns))
+
+        if args.apply and proposals:
+            before = advisor.measure(args.repeat)
+            advisor.apply(proposals)
+            after = advisor.measure(args.repeat)
+            print('\nQuery timings, ms (before -> after):')
+            for name in advisor.named_queries:
+                print(f'    {name}: {before[name] * 1000:.2f} -> {after[name] * 1000:.2f}')
+    except DBtools.ConnectionFailed:
+        exit('Connection to database failed! Set proper parameters for MYSQL_CONNECTION_PARAMS')
+    finally:
+        FourthTask.MYSQL_POOL.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE room
+ FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+ LINES TERMINATED BY '\n'
+ (`id`, `name`);
+
+LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE student
+ FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+ LINES TERMINATED BY '\n'
+ (`id`, `name`, `sex`, `room_id`, `birthday`);
\ No newline at end of file
@@ -0,0 +1,11 @@
+#room row_hash#
+ALTER TABLE room ADD COLUMN row_hash CHAR(32);
+
+#student row_hash#
+ALTER TABLE student ADD COLUMN row_hash CHAR(32);
+
+#student birth_days#
+ALTER TABLE student ADD COLUMN birth_days INT AS (TO_DAYS(birthday)) STORED;
+
+#room_stats birth_days_count#
+ALTER TABLE room_stats ADD COLUMN birth_days_count INT NOT NULL DEFAULT 0;
\ No newline at end of file
@@ -0,0 +1,57 @@
+#backfill#
+INSERT IGNORE INTO room_stats (room_id, students, birth_days_count, birth_days_sum, birth_days_square_sum,
+ males, females)
+ SELECT room_id, COUNT(*), COUNT(birth_days), COALESCE(SUM(birth_days), 0),
+ COALESCE(SUM(birth_days * birth_days), 0), COALESCE(SUM(sex = 'M'), 0), COALESCE(SUM(sex = 'F'), 0)
+ FROM student
+ GROUP BY room_id;
+
+#drop insert trigger#
+DROP TRIGGER IF EXISTS student_insert_room_stats;
+
+#create insert trigger#
+CREATE TRIGGER student_insert_room_stats AFTER INSERT ON student FOR EACH ROW
+ INSERT INTO room_stats (room_id, students, birth_days_count, birth_days_sum, birth_days_square_sum,
+ males, females)
+ VALUES (NEW.room_id, 1, NEW.birth_days IS NOT NULL, COALESCE(NEW.birth_days, 0),
+ COALESCE(NEW.birth_days * NEW.birth_days, 0), COALESCE(NEW.sex = 'M', 0), COALESCE(NEW.sex = 'F', 0))
+ ON DUPLICATE KEY UPDATE students = students + 1,
+ birth_days_count = birth_days_count + VALUES(birth_days_count),
+ birth_days_sum = birth_days_sum + VALUES(birth_days_sum),
+ birth_days_square_sum = birth_days_square_sum + VALUES(birth_days_square_sum),
+ males = males + VALUES(males), females = females + VALUES(females);
+
+#drop delete trigger#
+DROP TRIGGER IF EXISTS student_delete_room_stats;
+
+#create delete trigger#
+CREATE TRIGGER student_delete_room_stats AFTER DELETE ON student FOR EACH ROW
+ UPDATE room_stats SET students = students - 1,
+ birth_days_count = birth_days_count - (OLD.birth_days IS NOT NULL),
+ birth_days_sum = birth_days_sum - COALESCE(OLD.birth_days, 0),
+ birth_days_square_sum = birth_days_square_sum - COALESCE(OLD.birth_days * OLD.birth_days, 0),
+ males = males - COALESCE(OLD.sex = 'M', 0), females = females - COALESCE(OLD.sex = 'F', 0)
+ WHERE room_id = OLD.room_id;
+
+#drop update trigger#
+DROP TRIGGER IF EXISTS student_update_room_stats;
+
+#create update trigger#
+CREATE TRIGGER student_update_room_stats AFTER UPDATE ON student FOR EACH ROW
+ BEGIN
+ UPDATE room_stats SET students = students - 1,
+ birth_days_count = birth_days_count - (OLD.birth_days IS NOT NULL),
+ birth_days_sum = birth_days_sum - COALESCE(OLD.birth_days, 0),
+ birth_days_square_sum = birth_days_square_sum - COALESCE(OLD.birth_days * OLD.birth_days, 0),
+ males = males - COALESCE(OLD.sex = 'M', 0), females = females - COALESCE(OLD.sex = 'F', 0)
+ WHERE room_id = OLD.room_id;
+ INSERT INTO room_stats (room_id, students, birth_days_count, birth_days_sum, birth_days_square_sum,
+ males, females)
+ VALUES (NEW.room_id, 1, NEW.birth_days IS NOT NULL, COALESCE(NEW.birth_days, 0),
+ COALESCE(NEW.birth_days * NEW.birth_days, 0), COALESCE(NEW.sex = 'M', 0), COALESCE(NEW.sex = 'F', 0))
+ ON DUPLICATE KEY UPDATE students = students + 1,
+ birth_days_count = birth_days_count + VALUES(birth_days_count),
+ birth_days_sum = birth_days_sum + VALUES(birth_days_sum),
+ birth_days_square_sum = birth_days_square_sum + VALUES(birth_days_square_sum),
+ males = males + VALUES(males), females = females + VALUES(females);
+ END;
\ No newline at end of file
@@ -1,6 +1,7 @@
 CREATE TABLE IF NOT EXISTS room(
 id INT PRIMARY KEY,
-name VARCHAR(100)
+name VARCHAR(100),
+row_hash CHAR(32)
 );
 
 CREATE TABLE IF NOT EXISTS student(
@@ -9,5 +10,23 @@ name VARCHAR(100),
 sex VARCHAR(1),
 room_id INT,
 birthday DATETIME,
+birth_days INT AS (TO_DAYS(birthday)) STORED,
+row_hash CHAR(32),
+FOREIGN KEY (room_id)  REFERENCES room (id)
+);
+
+CREATE TABLE IF NOT EXISTS room_stats(
+room_id INT PRIMARY KEY,
+students INT NOT NULL DEFAULT 0,
+birth_days_count INT NOT NULL DEFAULT 0,
+birth_days_sum BIGINT NOT NULL DEFAULT 0,
+birth_days_square_sum BIGINT NOT NULL DEFAULT 0,
+males INT NOT NULL DEFAULT 0,
+females INT NOT NULL DEFAULT 0,
 FOREIGN KEY (room_id)  REFERENCES room (id)
+);
+
+CREATE TABLE IF NOT EXISTS loaded_data(
+id INT PRIMARY KEY,
+data_checksum VARCHAR(80)
 );
\ No newline at end of file
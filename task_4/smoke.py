@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+from typing import List
+
+import DBtools
+import IOtools
+from task_4 import MysqlPreparationTool, MysqlSetupTablesTool
+
+SQL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sqlite')
+
+
+class SmokeDatabase:
+    """
+    Embedded SQLite database in temporary directory, loaded from rooms and students the same way as in FourthTask
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.backend = DBtools.SqliteBackend(
+            DBtools.SqliteConnectionPool(os.path.join(directory, 'smoke.sqlite3')), SQL_DIRECTORY)
+        self.result_cache = DBtools.ResultCache(os.path.join(directory, 'cache'))
+
+    def load(self, rooms: List[dict], students: List[dict], sync: bool = False) -> None:
+        rooms_path = os.path.join(self.directory, 'rooms.json')
+        students_path = os.path.join(self.directory, 'students.json')
+        with open(rooms_path, 'w') as rooms_file, open(students_path, 'w') as students_file:
+            json.dump(rooms, rooms_file)
+            json.dump(students, students_file)
+
+        backend = self.backend
+        preparation_tool = MysqlPreparationTool(IOtools.StudentsRoomsImportTool(students_path, rooms_path))
+        MysqlSetupTablesTool(backend.setup_tables, backend.fill_tables, backend.connection_pool, preparation_tool,
+                             result_cache=self.result_cache,
+                             sync_tables=backend.sync_tables if sync else None,
+                             migrate_tables=backend.migrate_tables,
+                             setup_room_stats=backend.setup_room_stats,
+                             loaded_data=backend.loaded_data).export_data()
+
+    def query(self, query: str) -> list:
+        with self.backend.connection_pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+
+    def check_room_stats(self) -> None:
+        """
+        Summary rows maintained by triggers must be equal to aggregates of student table
+        """
+        expected = self.query(
+            "SELECT room_id, COUNT(*) AS students, COUNT(birth_days) AS birth_days_count, "
+            "COALESCE(SUM(birth_days), 0) AS birth_days_sum, "
+            "COALESCE(SUM(birth_days * birth_days), 0) AS birth_days_square_sum, "
+            "COALESCE(SUM(sex = 'M'), 0) AS males, COALESCE(SUM(sex = 'F'), 0) AS females "
+            "FROM student GROUP BY room_id ORDER BY room_id")
+        actual = self.query(
+            "SELECT room_id, students, birth_days_count, birth_days_sum, birth_days_square_sum, males, females "
+            "FROM room_stats WHERE students > 0 ORDER BY room_id")
+        assert actual == expected, "room_stats differs from student aggregates"
+
+    def close(self) -> None:
+        self.backend.connection_pool.close()
+
+
+def generate_data(rooms_number: int = 5, students_number: int = 50):
+    rooms = [{'id': room_id, 'name': f'Room #{room_id}'} for room_id in range(rooms_number)]
+    students = [
+        {
+            'id': student_id,
+            'name': f'Student #{student_id}',
+            'sex': 'MF'[student_id % 2],
+            'room': student_id % rooms_number,
+            'birthday': f'{1990 + student_id % 20}-0{1 + student_id % 9}-1{student_id % 10}T00:00:00.000000',
+        }
+        for student_id in range(students_number)
+    ]
+    return rooms, students
+
+
+def main():
+    rooms, students = generate_data()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SmokeDatabase(directory)
+        try:
+            database.load(rooms, students, sync=True)
+            database.check_room_stats()
+
+            #  Students without birthday or sex are counted, but neither summed nor taken for males or females
+            last_room = rooms[-1]['id']
+            null_students = [
+                {**students[0], 'id': len(students), 'room': last_room, 'birthday': None},
+                {**students[1], 'id': len(students) + 1, 'room': last_room, 'sex': None},
+            ]
+            students = students + null_students
+            database.load(rooms, students)
+            database.check_room_stats()
+            #  Filled rows have no hashes yet, so all of them are updated
+            database.load(rooms, students, sync=True)
+            database.check_room_stats()
+
+            #  Loading the same data again skips filling, but still sets up schema and triggers
+            database.query('DROP TRIGGER student_insert_room_stats')
+            database.load(rooms, students, sync=True)
+            assert database.query("SELECT name FROM sqlite_master WHERE name = 'student_insert_room_stats'"), \
+                "setup was skipped for already loaded data"
+
+            #  Cached checksum outlives deleted database, but data must be loaded into new one
+            database.close()
+            os.remove(os.path.join(directory, 'smoke.sqlite3'))
+            database.load(rooms, students, sync=True)
+            assert database.query('SELECT COUNT(*) AS students FROM student') == [{'students': len(students)}], \
+                "loading was skipped for new database"
+
+            #  Changed student is not updated by filling, but the same data is still synced afterwards
+            changed_students = [{**students[0], 'name': 'Changed', 'room': rooms[1]['id']}] + students[1:]
+            database.load(rooms, changed_students)
+            database.load(rooms, changed_students, sync=True)
+            assert database.query(f"SELECT name, room_id FROM student WHERE id = {students[0]['id']}") == \
+                [{'name': 'Changed', 'room_id': rooms[1]['id']}], "sync was skipped after filling the same data"
+            database.check_room_stats()
+            students = changed_students
+
+            #  Room, whose students are all gone, is removed together with its summary row
+            removed_room = rooms[-1]['id']
+            database.load(rooms[:-1], [s for s in students if s['room'] != removed_room], sync=True)
+            database.check_room_stats()
+            assert not database.query(f'SELECT * FROM room WHERE id = {removed_room}'), "room was not deleted"
+            assert not database.query(f'SELECT * FROM room_stats WHERE room_id = {removed_room}'), \
+                "room_stats row was not deleted"
+        finally:
+            database.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+INSERT OR IGNORE INTO room (`id`, `name`) VALUES (?, ?);
+
+INSERT OR IGNORE INTO student (`id`, `name`, `sex`, `room_id`, `birthday`) VALUES (?, ?, ?, ?, ?);
\ No newline at end of file
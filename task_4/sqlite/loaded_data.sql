@@ -0,0 +1,5 @@
+#select#
+SELECT `data_checksum` FROM loaded_data WHERE `id`=1;
+
+#replace#
+REPLACE INTO loaded_data (`id`, `data_checksum`) VALUES (1, ?);
\ No newline at end of file
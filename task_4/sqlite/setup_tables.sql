@@ -0,0 +1,32 @@
+CREATE TABLE IF NOT EXISTS room(
+id INTEGER PRIMARY KEY,
+name VARCHAR(100),
+row_hash CHAR(32)
+);
+
+CREATE TABLE IF NOT EXISTS student(
+id INTEGER PRIMARY KEY,
+name VARCHAR(100),
+sex VARCHAR(1),
+room_id INTEGER,
+birthday TEXT,
+birth_days INTEGER GENERATED ALWAYS AS (CAST(julianday(birthday) AS INTEGER)) STORED,
+row_hash CHAR(32),
+FOREIGN KEY (room_id)  REFERENCES room (id)
+);
+
+CREATE TABLE IF NOT EXISTS room_stats(
+room_id INTEGER PRIMARY KEY,
+students INTEGER NOT NULL DEFAULT 0,
+birth_days_count INTEGER NOT NULL DEFAULT 0,
+birth_days_sum INTEGER NOT NULL DEFAULT 0,
+birth_days_square_sum INTEGER NOT NULL DEFAULT 0,
+males INTEGER NOT NULL DEFAULT 0,
+females INTEGER NOT NULL DEFAULT 0,
+FOREIGN KEY (room_id)  REFERENCES room (id)
+);
+
+CREATE TABLE IF NOT EXISTS loaded_data(
+id INTEGER PRIMARY KEY,
+data_checksum VARCHAR(80)
+);
\ No newline at end of file
@@ -0,0 +1,32 @@
+#список комнат и количество студентов в каждой из них#
+SELECT r.id, r.name, rs.students as num_of_students
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY r.id;
+
+#top 5 комнат, где самые маленький средний возраст студентов#
+SELECT r.id, r.name
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY rs.birth_days_sum * 1.0 / NULLIF(rs.birth_days_count, 0)
+ LIMIT 5;
+
+#top 5 комнат с самой большой разницей в возрасте студентов#
+SELECT r.id, r.name
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY rs.birth_days_square_sum * 1.0 / NULLIF(rs.birth_days_count, 0)
+ - (rs.birth_days_sum * 1.0 / NULLIF(rs.birth_days_count, 0))
+ * (rs.birth_days_sum * 1.0 / NULLIF(rs.birth_days_count, 0)) ASC
+ LIMIT 5;
+
+#список комнат где живут разнополые студенты#
+SELECT r.id, r.name
+ FROM room_stats AS rs
+ INNER JOIN room as r
+ ON rs.room_id=r.id
+ WHERE rs.males > 0 AND rs.females > 0
+ ORDER BY r.id;
\ No newline at end of file
@@ -0,0 +1,23 @@
+#room hashes#
+SELECT `id`, `row_hash` FROM room;
+
+#student hashes#
+SELECT `id`, `row_hash` FROM student;
+
+#room upsert#
+INSERT INTO room (`id`, `name`, `row_hash`) VALUES (?, ?, ?)
+ ON CONFLICT (`id`) DO UPDATE SET `name`=excluded.`name`, `row_hash`=excluded.`row_hash`;
+
+#student upsert#
+INSERT INTO student (`id`, `name`, `sex`, `room_id`, `birthday`, `row_hash`) VALUES (?, ?, ?, ?, ?, ?)
+ ON CONFLICT (`id`) DO UPDATE SET `name`=excluded.`name`, `sex`=excluded.`sex`, `room_id`=excluded.`room_id`,
+ `birthday`=excluded.`birthday`, `row_hash`=excluded.`row_hash`;
+
+#student delete#
+DELETE FROM student WHERE `id`=?;
+
+#room stats delete#
+DELETE FROM room_stats WHERE `room_id`=?;
+
+#room delete#
+DELETE FROM room WHERE `id`=?;
\ No newline at end of file
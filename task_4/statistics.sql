@@ -1,29 +1,31 @@
 #список комнат и количество студентов в каждой из них#
-SELECT r.id, r.name, COUNT(s.room_id) as num_of_students
- FROM student AS s
- INNER JOIN room AS r ON s.room_id=r.id
- GROUP BY r.id;
+SELECT r.id, r.name, rs.students as num_of_students
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY r.id;
 
 #top 5 комнат, где самые маленький средний возраст студентов#
 SELECT r.id, r.name
- FROM student AS s
- INNER JOIN room AS r ON s.room_id=r.id
- GROUP BY r.id
- ORDER BY AVG(s.birthday)
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY rs.birth_days_sum / NULLIF(rs.birth_days_count, 0)
  LIMIT 5;
 
 #top 5 комнат с самой большой разницей в возрасте студентов#
 SELECT r.id, r.name
- FROM student AS s
- INNER JOIN room AS r ON s.room_id=r.id
- GROUP BY r.id
- ORDER BY STD(s.birthday) ASC
+ FROM room_stats AS rs
+ INNER JOIN room AS r ON rs.room_id=r.id
+ WHERE rs.students > 0
+ ORDER BY rs.birth_days_square_sum / NULLIF(rs.birth_days_count, 0)
+ - POW(rs.birth_days_sum / NULLIF(rs.birth_days_count, 0), 2) ASC
  LIMIT 5;
 
 #список комнат где живут разнополые студенты#
 SELECT r.id, r.name
- FROM student AS s
+ FROM room_stats AS rs
  INNER JOIN room as r
- ON s.room_id=r.id
- GROUP BY id
- HAVING COUNT(DISTINCT sex)=2;
\ No newline at end of file
+ ON rs.room_id=r.id
+ WHERE rs.males > 0 AND rs.females > 0
+ ORDER BY r.id;
\ No newline at end of file
@@ -0,0 +1,23 @@
+#room hashes#
+SELECT `id`, `row_hash` FROM room;
+
+#student hashes#
+SELECT `id`, `row_hash` FROM student;
+
+#room upsert#
+INSERT INTO room (`id`, `name`, `row_hash`) VALUES (%s, %s, %s)
+ ON DUPLICATE KEY UPDATE `name`=VALUES(`name`), `row_hash`=VALUES(`row_hash`);
+
+#student upsert#
+INSERT INTO student (`id`, `name`, `sex`, `room_id`, `birthday`, `row_hash`) VALUES (%s, %s, %s, %s, %s, %s)
+ ON DUPLICATE KEY UPDATE `name`=VALUES(`name`), `sex`=VALUES(`sex`), `room_id`=VALUES(`room_id`),
+ `birthday`=VALUES(`birthday`), `row_hash`=VALUES(`row_hash`);
+
+#student delete#
+DELETE FROM student WHERE `id`=%s;
+
+#room stats delete#
+DELETE FROM room_stats WHERE `room_id`=%s;
+
+#room delete#
+DELETE FROM room WHERE `id`=%s;
\ No newline at end of file
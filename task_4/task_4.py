@@ -1,8 +1,22 @@
+import argparse
+import csv
+import DBtools
+import hashlib
 import IOtools
+import json
+import os
 import pymysql
+import re
+import tempfile
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
+from queue import Empty, Full, Queue
 from sys import exit
-from typing import Dict, List, Tuple
+from threading import Event
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from xml.sax.saxutils import XMLGenerator
 from pprint import pprint
 
 
@@ -15,27 +29,116 @@ class FilePreparationTool(IOtools.ExportPreparationTool):
         return self.import_tool.imported_data
 
 
-class MysqlPreparationTool(IOtools.JSONPreparationTool):
+class MysqlPreparationTool(IOtools.ExportPreparationTool):
     """
-    Export preparation tool for filling Mysql database
+    Export preparation tool for filling Mysql database.
+    Rows are taken straight from imported rooms and students, without grouping students by rooms
     """
+    ROOM_COLUMNS = ('id', 'name')
+    STUDENT_COLUMNS = ('id', 'name', 'sex', 'room', 'birthday')
+
     def get_prepared_data(self) -> Tuple[list, list]:
-        prepared_data = super().get_prepared_data()
-        rooms = [(room['id'], room['name']) for room in prepared_data]
-        students = []
-        for room in prepared_data:
-            for student in room['students']:
-                student_info = (
-                    student['id'],
-                    student['name'],
-                    student['sex'],
-                    student['room'],
-                    student['birthday']
-                )
-                students.append(student_info)
+        self.import_tool.import_data()
+        imported_data = self.import_tool.imported_data
+        rooms = list(map(itemgetter(*self.ROOM_COLUMNS), imported_data['rooms']))
+        students = list(map(itemgetter(*self.STUDENT_COLUMNS), imported_data['students']))
         return rooms, students
 
 
+class PipelinedPreparationTool(MysqlPreparationTool):
+    """
+    Export preparation tool for filling database while students are still being parsed.
+    Rooms are loaded at once, students are decoded from file incrementally and returned as lazy iterator
+    of 'batch_size' batches, so import tool does not load students file
+    """
+    JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, *args, batch_size: int = 10000, chunk_size: int = 1 << 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def iter_json_array(file: IO[str], chunk_size: int) -> Iterator[Any]:
+        """
+        Decode items of top-level json array, while file is being read by chunks
+        """
+        decoder = json.JSONDecoder()
+        skip_whitespace = PipelinedPreparationTool.JSON_WHITESPACE.match
+        buffer = ''
+        position = 0
+        expected = '['
+        end_of_file = False
+        while True:
+            position = skip_whitespace(buffer, position).end()
+            if position < len(buffer):
+                char = buffer[position]
+                if expected == '[':
+                    if char != '[':
+                        raise ValueError(f'Expected json array, got {char!r}')
+                    position += 1
+                    expected = 'first item'
+                    continue
+                if expected == 'separator' or (expected == 'first item' and char == ']'):
+                    if char == ']':
+                        return
+                    if char != ',':
+                        raise ValueError(f'Expected "," or "]" in json array, got {char!r}')
+                    position += 1
+                    expected = 'item'
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if end_of_file:
+                        raise
+                else:
+                    #  Item is complete only if separator follows it, otherwise (like '2.' of '2.5')
+                    #  it could continue in the next chunk
+                    separator = skip_whitespace(buffer, end).end()
+                    if (separator < len(buffer) and buffer[separator] in ',]') or end_of_file:
+                        yield item
+                        position = end
+                        expected = 'separator'
+                        continue
+            elif end_of_file:
+                raise ValueError('Unexpected end of json array')
+            chunk = file.read(chunk_size)
+            end_of_file = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+    def iter_student_batches(self) -> Iterator[list]:
+        """
+        Batches are sorted by rooms, so concurrent loaders lock room statistics in the same order
+        """
+        get_student = itemgetter(*self.STUDENT_COLUMNS)
+        get_room = itemgetter(self.STUDENT_COLUMNS.index('room'))
+        with open(self.import_tool.students_path) as file:
+            students = map(get_student, self.iter_json_array(file, self.chunk_size))
+            while True:
+                batch = sorted(islice(students, self.batch_size), key=get_room)
+                if not batch:
+                    return
+                yield batch
+
+    def checksum(self) -> str:
+        """
+        Checksum of input files, so it is known before students are parsed
+        """
+        file_hash = hashlib.sha256()
+        for path in (self.import_tool.rooms_path, self.import_tool.students_path):
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(self.chunk_size), b''):
+                    file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def get_prepared_data(self) -> Tuple[list, Iterator[list]]:
+        with open(self.import_tool.rooms_path) as file:
+            rooms = list(map(itemgetter(*self.ROOM_COLUMNS), json.load(file)))
+        return rooms, self.iter_student_batches()
+
+
 class JSONPreparationTool(FilePreparationTool):
     """
     Export preparation tool for exporting data to json file
@@ -60,49 +163,513 @@ class XMLPreparationTool(FilePreparationTool):
         return root
 
 
+class StreamingPreparationTool(IOtools.ExportPreparationTool):
+    """
+    Export preparation tool, which passes statistics through, while they are read from database
+    """
+    def get_prepared_data(self) -> Iterator[Tuple[str, Iterator[dict]]]:
+        return self.import_tool.stream_data()
+
+
+class StreamingJSONExportTool(IOtools.ExportTool):
+    """
+    Writes streamed statistics to json file row by row, output is the same as of JSONExportTool
+    """
+    def export_data(self) -> None:
+        with open(f'{self.output}.json', 'w') as file:
+            file.write('{')
+            for stat_number, (stat_name, rooms) in enumerate(self.export_preparation_tool.get_prepared_data()):
+                file.write(f'{", " if stat_number else ""}{json.dumps(stat_name)}: [')
+                for room_number, room in enumerate(rooms):
+                    file.write(f'{", " if room_number else ""}{json.dumps(room)}')
+                file.write(']')
+            file.write('}')
+
+
+class StreamingXMLExportTool(IOtools.ExportTool):
+    """
+    Writes streamed statistics to xml file row by row, structure is the same as of XMLPreparationTool
+    """
+    def export_data(self) -> None:
+        with open(f'{self.output}.xml', 'w', encoding='us-ascii', errors='xmlcharrefreplace') as file:
+            xml = XMLGenerator(file, encoding='us-ascii', short_empty_elements=True)
+            xml.startElement('results', {})
+            for stat_name, rooms in self.export_preparation_tool.get_prepared_data():
+                xml.startElement(stat_name, {})
+                for room in rooms:
+                    xml.startElement('room', {})
+                    for key, value in room.items():
+                        xml.startElement(key, {})
+                        xml.characters(str(value))
+                        xml.endElement(key)
+                    xml.endElement('room')
+                xml.endElement(stat_name)
+            xml.endElement('results')
+
+
 class MysqlSetupTablesTool(IOtools.ExportTool):
     """
-    Sets up Mysql database
+    Sets up database (Mysql or any other, whose pooled connections have pymysql-like cursors).
+    If 'bulk_load_tables' file is given, tables are filled with LOAD DATA LOCAL INFILE from temporary csv files,
+    falling back to batched inserts from 'fill_tables' when server or client forbids it.
+    With 'loader_threads' > 1, batches are inserted in parallel, each on its own pooled connection.
+    If 'loaded_data' file is given, checksum of data is recorded in database together with loaded rows.
+    If 'result_cache' is given too, loading is skipped when database and cache both hold checksum of the same data,
+    and the cache is invalidated otherwise.
+    If 'sync_tables' file is given, tables are synced incrementally instead: rows are fingerprinted and compared
+    with 'row_hash' column, so only new, changed and removed rows are sent to database.
+    Tables created earlier are migrated with 'migrate_tables' queries, before 'setup_room_stats' queries
+    (which rely on migrated columns) are run. Their 'backfill' query is run only while room_stats is empty
     """
-    def __init__(self, setup_tables: str, fill_tables: str, *args, **kwargs):
+    #  Error codes, meaning that LOAD DATA LOCAL INFILE is disabled on server or client side
+    LOCAL_INFILE_FORBIDDEN_ERRORS = {1148, 2068, 3948}
+
+    class CsvNull(int):
+        """
+        Number-like field, so csv writer leaves it unquoted. LOAD DATA reads unquoted NULL as SQL NULL,
+        because load_tables.sql does not escape fields
+        """
+        def __str__(self) -> str:
+            return 'NULL'
+
+    CSV_NULL = CsvNull()
+
+    #  Tables in the order of their dependencies: student references room
+    TABLES = ('room', 'student')
+
+    #  Summary table of setup_room_stats queries
+    ROOM_STATS_TABLE = 'room_stats'
+
+    #  Concurrent loaders insert students of every batch in the order of their rooms, so room_stats rows
+    #  are locked by triggers in the same order and loaders do not deadlock
+    STUDENT_LOCK_ORDER = itemgetter(MysqlPreparationTool.STUDENT_COLUMNS.index('room'))
+
+    def __init__(self, setup_tables: str, fill_tables: str, *args, bulk_load_tables: str = None,
+                 batch_size: int = 10000, loader_threads: int = 1, result_cache: DBtools.ResultCache = None,
+                 sync_tables: str = None, migrate_tables: str = None, setup_room_stats: str = None,
+                 loaded_data: str = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.setup_tables = setup_tables
         self.fill_tables = fill_tables
+        self.bulk_load_tables = bulk_load_tables
+        self.batch_size = batch_size
+        self.loader_threads = loader_threads
+        self.result_cache = result_cache
+        self.sync_tables = sync_tables
+        self.migrate_tables = migrate_tables
+        self.setup_room_stats = setup_room_stats
+        self.loaded_data = loaded_data
 
     def export_data(self) -> None:
-        with self.output.cursor() as cursor:
-            with open(self.setup_tables) as file:
-                queries = map(lambda s: s.replace('\n', ''), file.read().split('\n\n'))
-                for query in queries:
-                    cursor.execute(query)
+        rooms, students = self.export_preparation_tool.get_prepared_data()
+        data_checksum = f'{self.load_mode}:{DBtools.ResultCache.checksum(rooms, students)}'
+
+        with self.output.connection() as connection, connection.cursor() as cursor:
+            #  Schema, migrations and triggers are applied even if the same data is already loaded
+            self.setup(cursor)
+            if self.is_loaded(cursor, data_checksum):
+                connection.commit()
+                return
+            self.start_loading(connection, cursor)
+            if self.sync_tables:
+                self.sync(cursor, rooms, students)
+            else:
+                self.fill(connection, cursor, rooms, students)
+            self.record_checksum(cursor, data_checksum)
+            connection.commit()
+
+        if self.result_cache:
+            self.result_cache.invalidate(data_checksum)
 
-            rooms, students = self.export_preparation_tool.get_prepared_data()
-            with open(self.fill_tables) as file:
-                queries = map(lambda s: s.replace('\n', ''), file.read().split('\n\n'))
-                for query, data in zip(queries, (rooms, students)):
-                    cursor.executemany(query, data)
+    @property
+    def load_mode(self) -> str:
+        """
+        Prefix of data checksum. Ignored inserts leave changed rows as they were, so only sync makes tables equal
+        to input data, and data, which was filled, is not taken for synced
+        """
+        return 'sync' if self.sync_tables else 'fill'
+
+    def loaded_checksum(self, cursor: pymysql.cursors.Cursor) -> Optional[str]:
+        """
+        Checksum of data, which was completely loaded into database, or None if it is unknown
+        """
+        if not self.loaded_data:
+            return None
+        cursor.execute(DBtools.read_named_queries(self.loaded_data)['select'])
+        rows = cursor.fetchall()
+        return rows[0]['data_checksum'] if rows else None
+
+    def record_checksum(self, cursor: pymysql.cursors.Cursor, data_checksum: Optional[str]) -> None:
+        if self.loaded_data:
+            cursor.execute(DBtools.read_named_queries(self.loaded_data)['replace'], (data_checksum,))
+
+    def is_loaded(self, cursor: pymysql.cursors.Cursor, data_checksum: str) -> bool:
+        """
+        Whether data is already in database and cached results were computed from it.
+        Checksum in database is the one, which tells what tables hold: cache outlives deleted database file
+        """
+        return bool(self.result_cache) and data_checksum == self.result_cache.data_checksum \
+            and data_checksum == self.loaded_checksum(cursor)
+
+    def start_loading(self, connection: pymysql.Connection, cursor: pymysql.cursors.Cursor) -> None:
+        """
+        Forget checksums of loaded data, so neither tables nor cached results are trusted, if loading fails
+        halfway. Loaders may commit on their own, so this is committed first
+        """
+        if self.result_cache:
+            self.result_cache.invalidate()
+        self.record_checksum(cursor, None)
+        connection.commit()
+
+    def setup(self, cursor: pymysql.cursors.Cursor) -> None:
+        """
+        Create and migrate tables, set up room statistics
+        """
+        for query in DBtools.read_queries(self.setup_tables):
+            cursor.execute(query)
+        migrated = self.migrate(cursor) if self.migrate_tables else set()
+        if self.setup_room_stats:
+            queries = DBtools.read_named_queries(self.setup_room_stats)
+            backfill = queries.pop('backfill', None)
+            for query in queries.values():
+                cursor.execute(query)
+            #  New summary columns are not known for existing rows, so statistics are aggregated anew
+            if self.ROOM_STATS_TABLE in migrated:
+                cursor.execute(f'DELETE FROM {self.ROOM_STATS_TABLE}')
+            #  Triggers keep statistics up to date, so existing students are aggregated only into empty table
+            cursor.execute(f'SELECT 1 FROM {self.ROOM_STATS_TABLE} LIMIT 1')
+            if backfill and not cursor.fetchall():
+                cursor.execute(backfill)
+
+    def fill(self, connection: pymysql.Connection, cursor: pymysql.cursors.Cursor,
+             rooms: list, students: list) -> None:
+        """
+        Send all rows to database, rows already present there are ignored. Caller commits the last transaction
+        """
+        insert_queries = DBtools.read_queries(self.fill_tables)
+        if self.bulk_load_tables:
+            load_queries = DBtools.read_queries(self.bulk_load_tables)
+        else:
+            load_queries = [None] * len(insert_queries)
 
-            self.output.commit()
+        bulk_load_allowed = True
+        lock_orders = (None, self.STUDENT_LOCK_ORDER)
+        for insert_query, load_query, data, lock_order in zip(insert_queries, load_queries, (rooms, students),
+                                                               lock_orders):
+            if load_query and bulk_load_allowed:
+                bulk_load_allowed = self.bulk_load(cursor, load_query, data)
+                if bulk_load_allowed:
+                    continue
+            if self.loader_threads > 1:
+                #  Loaders use other connections, so rows they reference (rooms) must be committed first
+                connection.commit()
+                self.parallel_insert(insert_query, data, lock_order)
+            else:
+                self.batched_insert(cursor, insert_query, data)
+
+    @staticmethod
+    def row_hash(row: tuple) -> str:
+        return hashlib.md5(json.dumps(row, default=str).encode()).hexdigest()
+
+    def migrate(self, cursor: pymysql.cursors.Cursor) -> Set[str]:
+        """
+        Add columns missing in tables. Migration queries are named '<table> <column>'
+        and run only if the column is not in the table yet, so existing rows are migrated in place.
+        Returns names of migrated tables
+        """
+        migrated = set()
+        for query_name, query in DBtools.read_named_queries(self.migrate_tables).items():
+            table, column = query_name.split()
+            cursor.execute(f'SELECT * FROM {table} LIMIT 0')
+            cursor.fetchall()
+            if column not in (description[0] for description in cursor.description):
+                cursor.execute(query)
+                migrated.add(table)
+        return migrated
+
+    def sync(self, cursor: pymysql.cursors.Cursor, rooms: list, students: list) -> None:
+        """
+        Upsert new and changed rows, delete rows missing in input data
+        """
+        queries = DBtools.read_named_queries(self.sync_tables)
+
+        changes = {}
+        for table, rows in zip(self.TABLES, (rooms, students)):
+            cursor.execute(queries[f'{table} hashes'])
+            existing_hashes = {row['id']: row['row_hash'] for row in cursor.fetchall()}
+            upserts = []
+            for row in rows:
+                row_hash = self.row_hash(row)
+                if existing_hashes.pop(row[0], None) != row_hash:
+                    upserts.append((*row, row_hash))
+            #  Everything left was not found in input data
+            changes[table] = (upserts, [(row_id,) for row_id in existing_hashes])
+
+        #  Referenced rows are upserted first and deleted last
+        for table in self.TABLES:
+            self.batched_insert(cursor, queries[f'{table} upsert'], changes[table][0])
+        for table in reversed(self.TABLES):
+            #  Summary rows (left by triggers after students are deleted) reference deleted rows too
+            if f'{table} stats delete' in queries:
+                self.batched_insert(cursor, queries[f'{table} stats delete'], changes[table][1])
+            self.batched_insert(cursor, queries[f'{table} delete'], changes[table][1])
+
+    def batched_insert(self, cursor: pymysql.cursors.Cursor, query: str, data: list) -> None:
+        for start in range(0, len(data), self.batch_size):
+            cursor.executemany(query, data[start:start + self.batch_size])
+
+    def parallel_insert(self, query: str, data: list, lock_order: Callable[[tuple], Any] = None) -> None:
+        """
+        Insert batches in 'loader_threads' threads. Every batch is committed separately.
+        If 'lock_order' is given, rows of every batch are inserted sorted by it
+        """
+        def insert_batch(batch: list) -> None:
+            if lock_order:
+                batch.sort(key=lock_order)
+            with self.output.connection() as connection, connection.cursor() as cursor:
+                cursor.executemany(query, batch)
+                connection.commit()
+
+        with ThreadPoolExecutor(max_workers=self.loader_threads) as executor:
+            futures = [
+                executor.submit(insert_batch, data[start:start + self.batch_size])
+                for start in range(0, len(data), self.batch_size)
+            ]
+            for future in futures:
+                future.result()
+
+    def bulk_load(self, cursor: pymysql.cursors.Cursor, query: str, data: list) -> bool:
+        """
+        Stream rows into temporary csv file and load it with LOAD DATA LOCAL INFILE.
+        Returns False if bulk loading is forbidden
+        """
+        file = tempfile.NamedTemporaryFile('w', newline='', suffix='.csv', delete=False)
+        try:
+            with file:
+                #  Strings are quoted, so that only None values are written as unquoted NULL
+                csv.writer(file, lineterminator='\n', quoting=csv.QUOTE_NONNUMERIC).writerows(
+                    [self.CSV_NULL if value is None else value for value in row] for row in data)
+            cursor.execute(query, (file.name,))
+        except (pymysql.err.OperationalError, pymysql.err.InternalError) as error:
+            if error.args and error.args[0] in self.LOCAL_INFILE_FORBIDDEN_ERRORS:
+                return False
+            raise
+        finally:
+            os.remove(file.name)
+        return True
+
+
+class PipelinedSetupTablesTool(MysqlSetupTablesTool):
+    """
+    Sets up database like MysqlSetupTablesTool, but overlaps parsing of students with inserting them:
+    parser thread puts batches from PipelinedPreparationTool into bounded queue, while 'loader_threads' workers
+    insert them, each on its own pooled connection. With several loaders every batch is committed separately.
+    Bulk loading and syncing need all rows at once, so they are not used.
+    Data checksum is computed from input files, so cached results are not reused after switching from
+    or to MysqlSetupTablesTool
+    """
+    #  Seconds between checks, whether the other side of the queue has failed
+    QUEUE_POLL_INTERVAL = 0.1
+
+    def __init__(self, *args, queue_size: int = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue_size = queue_size or 2 * self.loader_threads
+
+    @property
+    def load_mode(self) -> str:
+        return 'fill'
+
+    def export_data(self) -> None:
+        rooms, student_batches = self.export_preparation_tool.get_prepared_data()
+        data_checksum = f'{self.load_mode}:{self.export_preparation_tool.checksum()}'
+
+        insert_rooms_query, insert_students_query = DBtools.read_queries(self.fill_tables)
+        with self.output.connection() as connection, connection.cursor() as cursor:
+            #  Schema, migrations and triggers are applied even if the same data is already loaded
+            self.setup(cursor)
+            if self.is_loaded(cursor, data_checksum):
+                connection.commit()
+                return
+            self.start_loading(connection, cursor)
+            #  Loaders use other connections, so rooms, which students reference, must be committed first
+            self.batched_insert(cursor, insert_rooms_query, rooms)
+            connection.commit()
+        self.pipelined_insert(insert_students_query, student_batches)
+
+        #  Loaders have committed their batches, so checksum is recorded only after all of them succeeded
+        with self.output.connection() as connection, connection.cursor() as cursor:
+            self.record_checksum(cursor, data_checksum)
+            connection.commit()
+
+        if self.result_cache:
+            self.result_cache.invalidate(data_checksum)
+
+    def pipelined_insert(self, query: str, batches: Iterator[list]) -> None:
+        """
+        Consume batches in parser thread and insert them in loader threads. If any thread fails,
+        the others stop and the error is raised
+        """
+        batch_queue = Queue(maxsize=self.queue_size)
+        failed = Event()
+
+        def put(batch: Optional[list]) -> bool:
+            while not failed.is_set():
+                try:
+                    batch_queue.put(batch, timeout=self.QUEUE_POLL_INTERVAL)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def get() -> Optional[list]:
+            while not failed.is_set():
+                try:
+                    return batch_queue.get(timeout=self.QUEUE_POLL_INTERVAL)
+                except Empty:
+                    pass
+            return None
+
+        def parse() -> None:
+            try:
+                for batch in batches:
+                    if not put(batch):
+                        return
+            except BaseException:
+                failed.set()
+                raise
+            finally:
+                #  None tells loader, that there are no more batches
+                for _ in range(self.loader_threads):
+                    put(None)
+
+        def load() -> None:
+            try:
+                with self.output.connection() as connection, connection.cursor() as cursor:
+                    batch = get()
+                    while batch is not None:
+                        cursor.executemany(query, batch)
+                        if self.loader_threads > 1:
+                            #  Loaders update the same room statistics, so they should not hold locks for long
+                            connection.commit()
+                        batch = get()
+                    if failed.is_set():
+                        #  Input is not complete, so rows of this loader are not committed
+                        connection.rollback()
+                        return
+                    connection.commit()
+            except BaseException:
+                failed.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.loader_threads + 1) as executor:
+            futures = [executor.submit(parse)] + [executor.submit(load) for _ in range(self.loader_threads)]
+            for future in futures:
+                future.result()
 
 
 class MysqlGetStatsTool(IOtools.ImportTool):
     """
-    Executes queries defined in statistics.sql file
+    Executes queries defined in statistics.sql file.
+    Queries are independent, so with 'parallelism' > 1 they are run concurrently, each on its own pooled connection.
+    If 'result_cache' is given, cached results are used and database is not queried for them.
+    If 'profiler' is given, executed queries are profiled by it
     """
-    def __init__(self, path_to_sql_queries: str, connection: pymysql.Connection):
+    def __init__(self, path_to_sql_queries: str, connection_pool: DBtools.ConnectionPool, parallelism: int = 1,
+                 result_cache: DBtools.ResultCache = None, profiler: DBtools.QueryProfiler = None):
         super().__init__()
-        self.connection = connection
+        self.connection_pool = connection_pool
         self.path_to_sql_queries = path_to_sql_queries
+        self.parallelism = parallelism
+        self.result_cache = result_cache
+        self.profiler = profiler
+
+    def run_query(self, cursor: pymysql.cursors.Cursor, query_name: str, query: str) -> list:
+        if self.profiler:
+            return self.profiler.profile(cursor, query_name, query)
+        cursor.execute(query)
+        return cursor.fetchall()
+
+    def execute_query(self, query_name: str, query: str) -> list:
+        with self.connection_pool.connection() as connection, connection.cursor() as cursor:
+            return self.run_query(cursor, query_name, query)
+
+    def execute_queries(self, named_queries: Dict[str, str]) -> Dict[str, list]:
+        if not named_queries:
+            return {}
+        if self.parallelism > 1:
+            with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+                results = executor.map(self.execute_query, named_queries.keys(), named_queries.values())
+                return dict(zip(named_queries, results))
+
+        results = {}
+        with self.connection_pool.connection() as connection, connection.cursor() as cursor:
+            for query_name, query in named_queries.items():
+                results[query_name] = self.run_query(cursor, query_name, query)
+        return results
 
     def import_data(self):
-        with open(self.path_to_sql_queries) as file:
-            queries_and_names = map(lambda s: s.replace('\n', ''), file.read().split('\n\n'))
-        with self.connection.cursor() as cursor:
-            for query_and_name in queries_and_names:
-                query_name = query_and_name[1:query_and_name.rfind('#')]
-                query = query_and_name[query_and_name.rfind('#') + 1:]
+        named_queries = DBtools.read_named_queries(self.path_to_sql_queries)
+        cached = {}
+        if self.result_cache:
+            for query_name, query in named_queries.items():
+                rows = self.result_cache.get(query)
+                if rows is not None:
+                    cached[query_name] = rows
+                    if self.profiler:
+                        self.profiler.mark_cached(query_name, query)
+
+        executed = self.execute_queries({
+            query_name: query for query_name, query in named_queries.items() if query_name not in cached
+        })
+        if self.result_cache:
+            for query_name, rows in executed.items():
+                self.result_cache.set(named_queries[query_name], rows)
+
+        for query_name in named_queries:
+            self.imported_data[query_name] = cached[query_name] if query_name in cached else executed[query_name]
+
+    def stream_data(self) -> Iterator[Tuple[str, Iterator[dict]]]:
+        """
+        Yield names of queries together with their rows, which are read from unbuffered server-side cursor,
+        so memory use does not depend on result size. Rows of a query must be consumed before the next query.
+        Results are neither cached nor profiled and 'imported_data' stays empty
+        """
+        for query_name, query in DBtools.read_named_queries(self.path_to_sql_queries).items():
+            with self.connection_pool.connection() as connection, \
+                    connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
                 cursor.execute(query)
-                self.imported_data[query_name] = cursor.fetchall()
+                yield query_name, iter(cursor.fetchone, None)
+
+
+class CLI(IOtools.CLI):
+    """
+    CLI util, which also allows to choose database backend
+    """
+    AVAILABLE_BACKENDS = ['mysql', 'sqlite']
+
+    @classmethod
+    def get_parser(cls) -> argparse.ArgumentParser:
+        parser = super().get_parser()
+        parser.add_argument('--backend',
+                            help='Database to compute statistics in. Defaults to mysql',
+                            choices=cls.AVAILABLE_BACKENDS, default='mysql')
+        parser.add_argument('--sync',
+                            help='Sync tables incrementally: send only new, changed and removed rows',
+                            action='store_true')
+        parser.add_argument('--stream',
+                            help='Stream statistics from server-side cursors straight to output file',
+                            action='store_true')
+        parser.add_argument('--pipeline',
+                            help='Insert students, while students file is still being parsed. Ignored with --sync',
+                            action='store_true')
+        parser.add_argument('--profile',
+                            help='Write timings, session status deltas and EXPLAIN output of statistics queries '
+                                 'to performance report next to output file. Ignored with --stream',
+                            action='store_true')
+        parser.add_argument('--no-cache',
+                            help='Reload data and recompute statistics, even if data has not changed',
+                            action='store_true')
+        return parser
 
 
 class FourthTask:
@@ -110,51 +677,112 @@ class FourthTask:
         'json': (JSONPreparationTool, IOtools.JSONExportTool),
         'xml': (XMLPreparationTool, IOtools.XMLExportTool)
     }
+    AVAILABLE_EXTENSIONS_AND_STREAMING_EXPORT_TOOLS = {
+        'json': (StreamingPreparationTool, StreamingJSONExportTool),
+        'xml': (StreamingPreparationTool, StreamingXMLExportTool)
+    }
 
     OUTPUT_FILE_NAME = 'rooms_and_students'
+    PERFORMANCE_REPORT_FILE_NAME = f'{OUTPUT_FILE_NAME}.performance.json'
+
+    #  Parameters of Mysql database connections
+    #  User must be allowed to create triggers, see DBtools.MysqlBackend
+    MYSQL_CONNECTION_PARAMS = {
+        'host': 'localhost',
+        'user': 'task_4_user',
+        'password': 'task_4_password',
+        'db': 'task_4_db',
+        'charset': 'utf8mb4',
+        'cursorclass': pymysql.cursors.DictCursor,
+    }
+    #  Connections are opened lazily, when tools borrow them from the pool
+    MYSQL_POOL_SIZE = 5
+    #  Threads inserting data in parallel, when bulk loading is not allowed. Setup itself holds one connection
+    MYSQL_LOADER_THREADS = MYSQL_POOL_SIZE - 1
+    #  Number of statistics queries executed concurrently
+    STATS_PARALLELISM = 4
+    MYSQL_POOL = DBtools.MysqlConnectionPool(MYSQL_CONNECTION_PARAMS, size=MYSQL_POOL_SIZE)
+    #  Server may request any client file over connection with LOAD DATA LOCAL enabled,
+    #  so it is enabled only on connections, which load data
+    MYSQL_INGEST_POOL = DBtools.MysqlConnectionPool({**MYSQL_CONNECTION_PARAMS, 'local_infile': True},
+                                                    size=MYSQL_POOL_SIZE)
 
-    try:
-        #  Connect to Mysql database
-        MYSQL_CONNECTION = pymysql.connect(
-            host='localhost',
-            user='task_4_user',
-            password='task_4_password',
-            db='task_4_db',
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-        )
-    except pymysql.err.OperationalError:
-        exit('Connection to database failed! Set proper parameters for MYSQL_CONNECTION')
-
-    #  Paths to files with SQL queries
-    SETUP_TABLES_QUERIES = "setup_tables.sql"
-    FILL_TABLES_QUERIES = "fill_tables.sql"
-    STATS_QUERIES = "statistics.sql"
+    #  Embedded database file, used instead of Mysql with '--backend sqlite'
+    SQLITE_DATABASE = 'task_4.sqlite3'
+    SQLITE_POOL = DBtools.SqliteConnectionPool(SQLITE_DATABASE, size=MYSQL_POOL_SIZE)
+
+    #  Backends hold connection pools and paths to files with SQL queries in their dialects
+    BACKENDS = {
+        'mysql': DBtools.MysqlBackend(MYSQL_POOL, loader_threads=MYSQL_LOADER_THREADS,
+                                      ingest_connection_pool=MYSQL_INGEST_POOL),
+        'sqlite': DBtools.SqliteBackend(SQLITE_POOL),
+    }
+
+    #  Statistics are cached on disk, separately for every backend
+    STATS_CACHE_DIRECTORY = '.stats_cache'
 
     @classmethod
     def execute_fourth_task(cls):
         """
         Start task execution
         """
-        args = IOtools.CLI.get_args()
+        args = CLI.get_args()
+        backend = cls.BACKENDS[args.backend]
+        result_cache = DBtools.ResultCache(os.path.join(cls.STATS_CACHE_DIRECTORY, args.backend))
+        if args.no_cache:
+            result_cache.invalidate()
 
         #  Setting up database
         import_initial_data_tool = IOtools.StudentsRoomsImportTool(args.students, args.rooms)
-        setup_db_preparation_tool = MysqlPreparationTool(import_initial_data_tool)
-        setup_db_tool = MysqlSetupTablesTool(cls.SETUP_TABLES_QUERIES, cls.FILL_TABLES_QUERIES,
-                                             cls.MYSQL_CONNECTION, setup_db_preparation_tool)
+        if args.pipeline and not args.sync:
+            setup_db_preparation_tool = PipelinedPreparationTool(import_initial_data_tool)
+            setup_db_tool_class = PipelinedSetupTablesTool
+        else:
+            setup_db_preparation_tool = MysqlPreparationTool(import_initial_data_tool)
+            setup_db_tool_class = MysqlSetupTablesTool
+        setup_db_tool = setup_db_tool_class(backend.setup_tables, backend.fill_tables,
+                                            backend.ingest_connection_pool, setup_db_preparation_tool,
+                                            bulk_load_tables=backend.bulk_load_tables,
+                                            loader_threads=backend.loader_threads,
+                                            result_cache=result_cache,
+                                            sync_tables=backend.sync_tables if args.sync else None,
+                                            migrate_tables=backend.migrate_tables,
+                                            setup_room_stats=backend.setup_room_stats,
+                                            loaded_data=backend.loaded_data)
 
-        #  Exporting statistics to either json or xml file
-        fetch_stats_from_db_tool = MysqlGetStatsTool(cls.STATS_QUERIES, cls.MYSQL_CONNECTION)
-        export_preparation_tool_class, export_tool_class = cls.AVAILABLE_EXTENSIONS_AND_EXPORT_TOOLS[args.format]
+        #  Exporting statistics to either json or xml file. Streamed queries are not profiled
+        profiler = backend.get_profiler() if args.profile and not args.stream else None
+        fetch_stats_from_db_tool = MysqlGetStatsTool(backend.stats_queries, backend.connection_pool,
+                                                     parallelism=cls.STATS_PARALLELISM,
+                                                     result_cache=result_cache,
+                                                     profiler=profiler)
+        if args.stream:
+            export_tools = cls.AVAILABLE_EXTENSIONS_AND_STREAMING_EXPORT_TOOLS
+        else:
+            export_tools = cls.AVAILABLE_EXTENSIONS_AND_EXPORT_TOOLS
+        export_preparation_tool_class, export_tool_class = export_tools[args.format]
         export_stats_to_file_tool = export_tool_class(cls.OUTPUT_FILE_NAME,
                                                       export_preparation_tool_class(fetch_stats_from_db_tool))
 
         try:
             setup_db_tool.export_data()
+            #  Connections, which loaded data, are not kept open while statistics are queried
+            backend.ingest_connection_pool.close()
             export_stats_to_file_tool.export_data()
+            if profiler:
+                profiler.write(cls.PERFORMANCE_REPORT_FILE_NAME)
         except (FileNotFoundError, PermissionError):
             print('Could not export to file! Try to change input parameters.')
+        except DBtools.ConnectionFailed:
+            exit(f'Connection to database failed! Set proper parameters for {args.backend} backend')
+        finally:
+            backend.ingest_connection_pool.close()
+            backend.connection_pool.close()
+
+        if args.stream:
+            #  Streamed statistics are not kept in memory, they can be found only in output file
+            print(f'Statistics are written to {cls.OUTPUT_FILE_NAME}.{args.format}')
+            return
 
         #  Take a look at 'statistics.sql'. There are all SQL queries, required by task, and their names,
         #  separated by '#'.